@@ -0,0 +1,451 @@
+"""Micro-benchmarks de las funciones calientes del controlador.
+
+Corre offline (sin cámara ni MIDI) con landmarks sintéticos y un frame de
+1280x720. El frame completo incluye todo lo que main() hace por frame salvo
+MediaPipe y la ventana: controles, mapeos (mapeos.json), memoria
+compartida (bloque temporal) y grabador de sesión (directorio temporal). Uso:
+
+    python benchmarks/bench_controlador.py                      # Solo mostrar
+    python benchmarks/bench_controlador.py --save base.json     # Guardar baseline
+    python benchmarks/bench_controlador.py --compare base.json  # Comparar
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+# El controlador vive en la raíz del repo (no es un paquete)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import controlador_midi_vision as cmv
+from grabador_sesion import SessionRecorder
+from memoria_compartida import LandmarkPublisher
+from motor_mapeos import MappingEngine
+
+FRAME_WIDTH = 1280
+FRAME_HEIGHT = 720
+
+HAND_COUNTS = (1, 2, 4)
+PAD_COUNTS = (4, 16, 64)
+MAPPING_COUNTS = (4, 64, 512)
+
+MAPPINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             cmv.MAPPINGS_FILE)
+
+# Umbral para marcar una regresión al comparar con la baseline
+REGRESSION_THRESHOLD = 1.10
+
+# ============================================
+# FIXTURES SINTÉTICOS
+# ============================================
+
+class NullMidiOutput:
+    """Puerto MIDI que descarta los mensajes (solo los cuenta)"""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, msg):
+        self.sent += 1
+
+    def close(self):
+        pass
+
+
+class SyntheticLandmark:
+    def __init__(self, x, y, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class SyntheticHand:
+    """Imita hand_landmarks de MediaPipe (atributo .landmark con 21 puntos)"""
+
+    def __init__(self, palm_x, palm_y, pinch=0.05, scale=0.12):
+        # Mano abierta apuntando hacia arriba, centrada en (palm_x, palm_y) normalizado
+        rng = np.random.default_rng(int(palm_x * 1000 + palm_y * 10))
+        points = np.zeros((21, 3))
+        points[0] = (palm_x, palm_y + scale * 0.5, 0)           # Muñeca
+        for finger in range(5):
+            base = 1 + finger * 4
+            x = palm_x + (finger - 2) * scale * 0.25
+            for joint in range(4):
+                points[base + joint] = (x, palm_y - scale * (0.1 + 0.25 * joint), 0)
+        points[9] = (palm_x, palm_y - scale * 0.5, 0)            # Base dedo medio
+        points[4] = (palm_x - pinch / 2, palm_y - scale * 0.6, 0)  # Pulgar
+        points[8] = (palm_x + pinch / 2, palm_y - scale * 0.6, 0)  # Índice
+        points[:, :2] += rng.normal(0, 0.002, (21, 2))
+        # Floats de Python, como los landmarks de MediaPipe
+        self.landmark = [SyntheticLandmark(*p) for p in points.tolist()]
+
+
+class SyntheticClassification:
+    def __init__(self, label):
+        self.label = label
+
+
+class SyntheticHandedness:
+    def __init__(self, label):
+        self.classification = [SyntheticClassification(label)]
+
+
+class SyntheticResults:
+    """Imita el resultado de hands.process()"""
+
+    def __init__(self, hands, labels):
+        self.multi_hand_landmarks = hands
+        self.multi_handedness = [SyntheticHandedness(label) for label in labels]
+
+
+# Posiciones (normalizadas) de las manos: dos en zona de sliders, dos en pads
+HAND_POSITIONS = [
+    (0.40, 0.30),
+    (0.60, 0.30),
+    (0.12, 0.80),
+    (0.88, 0.80),
+]
+HAND_LABELS = ["Left", "Right", "Hand3", "Hand4"]
+
+
+def make_hands(n):
+    hands = [SyntheticHand(x, y) for x, y in HAND_POSITIONS[:n]]
+    return hands, HAND_LABELS[:n]
+
+
+def make_frame():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+
+
+def make_pads(n):
+    """n pads en grilla dentro de la zona de pads (4 = layout real)"""
+    if n == 4:
+        return list(cmv.pads)
+    aspect = FRAME_WIDTH / FRAME_HEIGHT
+    top = cmv.PAD_MIN_Y + 0.05
+    rows = max(1, int(round(math.sqrt(n / 4))))
+    cols = int(math.ceil(n / rows))
+    cell_w = 1.0 / cols
+    cell_h = (1.0 - top) / rows
+    size = min(cell_w * aspect, cell_h) * 0.8  # En alturas de frame
+    pads = []
+    for i in range(n):
+        row, col = divmod(i, cols)
+        pads.append(cmv.Pad((col + 0.5) * cell_w, top + (row + 0.5) * cell_h,
+                            size, size * 1.2, 36 + i % 48,
+                            f"P{i + 1}", cmv.PAD_COLORS[i % len(cmv.PAD_COLORS)]))
+    return pads
+
+
+def make_palm_trajectory(engine, n_hands, n_frames=60):
+    """Palmas (espacio del motor) que entran y salen de los pads.
+
+    Cada mano oscila verticalmente sobre un pad distinto (un ciclo por
+    segundo a 60 fps), así se ejercitan el cruce interpolado y la velocity.
+    """
+    frames = []
+    for i in range(n_frames):
+        palms = {}
+        for hand in range(n_hands):
+            pad = (hand * len(engine.centers)) // n_hands
+            cx, cy = engine.centers[pad]
+            phase = 2 * math.pi * (i / n_frames + hand / 4)
+            palms[HAND_LABELS[hand]] = (float(cx),
+                                        float(cy + 2 * engine.radii[pad] * math.sin(phase)))
+        frames.append(palms)
+    return frames
+
+
+def make_pad_engine(pads):
+    return cmv.build_pad_engine(pads, FRAME_WIDTH / FRAME_HEIGHT)
+
+
+def make_mapping_engine(workdir, n=None):
+    """Motor con mapeos.json, o con n mapeos repitiendo los de mapeos.json"""
+    if n is None:
+        return MappingEngine(MAPPINGS_FILE, default_channel=cmv.MIDI_CHANNEL)
+    with open(MAPPINGS_FILE) as f:
+        config = json.load(f)
+    templates = [mapping for mappings in config['sets'].values() for mapping in mappings]
+    mappings = []
+    for i in range(n):
+        mapping = dict(templates[i % len(templates)])
+        mapping['name'] = f"{mapping.get('name', 'mapeo')} #{i}"
+        mappings.append(mapping)
+    path = os.path.join(workdir, f"mapeos_{n}.json")
+    with open(path, 'w') as f:
+        json.dump({'sets': {f"bench_{n}": mappings}}, f)
+    return MappingEngine(path, default_channel=cmv.MIDI_CHANNEL)
+
+
+class FrameSinks:
+    """Memoria compartida y grabador como en main(), uno por cantidad de pads"""
+
+    def __init__(self):
+        self.workdir = tempfile.mkdtemp(prefix="bench_controlador_")
+        self._sinks = {}
+
+    def get(self, n_pads):
+        if n_pads not in self._sinks:
+            publisher = LandmarkPublisher(f"bench_{uuid.uuid4().hex[:8]}",
+                                          max_hands=2,
+                                          max_sliders=len(cmv.sliders),
+                                          max_pads=n_pads)
+            recorder = SessionRecorder(os.path.join(self.workdir, f"sesion_{n_pads}"),
+                                       max_hands=2,
+                                       n_sliders=len(cmv.sliders),
+                                       n_pads=n_pads,
+                                       stage_names=cmv.STAGE_NAMES)
+            self._sinks[n_pads] = (publisher, recorder)
+        return self._sinks[n_pads]
+
+    def close(self):
+        for publisher, recorder in self._sinks.values():
+            publisher.close()
+            recorder.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+# ============================================
+# MEDICIÓN
+# ============================================
+
+def measure(func, repeats=7, min_time=0.05):
+    """Tiempo por llamada en µs (mínimo, mediana) con auto-calibración de loops"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops * 1e6)
+    return {
+        'min_us': min(samples),
+        'median_us': statistics.median(samples),
+        'loops': loops,
+        'repeats': repeats,
+    }
+
+
+def build_benchmarks(sinks):
+    """Lista de (nombre, función) a medir"""
+    frame = make_frame()
+    w, h = FRAME_WIDTH, FRAME_HEIGHT
+    benchmarks = []
+
+    # --- Detección ---
+    hand, _ = make_hands(1)
+    hand = hand[0]
+    benchmarks.append(("get_pinch_distance",
+                       lambda: cmv.get_pinch_distance(hand, w, h)))
+    benchmarks.append(("get_palm_center",
+                       lambda: cmv.get_palm_center(hand, w, h)))
+
+    # --- Slider ---
+    slider = cmv.sliders[0]
+    benchmarks.append(("PinchSlider.update_from_pinch",
+                       lambda: slider.update_from_pinch(0.17, 0.5, 0.25)))
+    slider_frame = frame.copy()
+    benchmarks.append(("PinchSlider.draw",
+                       lambda: slider.draw(slider_frame)))
+
+    # --- Separador ---
+    separator_frame = frame.copy()
+    benchmarks.append(("draw_separator_line",
+                       lambda: cmv.draw_separator_line(separator_frame)))
+
+    # --- Pads: hit-test y dibujo escalados ---
+    # El loop usa PadEngine.update; Pad.check_touch_with_palm queda solo
+    # como referencia del hit-test escalar anterior
+    for n_pads in PAD_COUNTS:
+        pads = make_pads(n_pads)
+        pad_frame = frame.copy()
+
+        def draw_pads(pads=pads, pad_frame=pad_frame):
+            for pad in pads:
+                pad.draw(pad_frame)
+
+        benchmarks.append((f"Pad.draw[pads={n_pads}]", draw_pads))
+
+        for n_hands in HAND_COUNTS:
+            hands, _ = make_hands(n_hands)
+            palms = [cmv.get_palm_center_normalized(hand) for hand in hands]
+
+            def check_pads(pads=pads, palms=palms):
+                for palm_x, palm_y in palms:
+                    for pad in pads:
+                        pad.check_touch_with_palm(palm_x, palm_y)
+
+            benchmarks.append((f"Pad.check_touch_with_palm[hands={n_hands},pads={n_pads}]",
+                               check_pads))
+
+            engine = make_pad_engine(pads)
+            trajectory = make_palm_trajectory(engine, n_hands)
+            step = [0]
+
+            def update_engine(engine=engine, trajectory=trajectory, step=step):
+                i = step[0]
+                step[0] += 1
+                engine.update(i / 60, trajectory[i % len(trajectory)])
+
+            benchmarks.append((f"PadEngine.update[hands={n_hands},pads={n_pads}]",
+                               update_engine))
+
+    # --- Mapeos: evaluación en lote escalada ---
+    mapping_hands, mapping_labels = make_hands(2)
+    mapping_landmarks = np.array(
+        [[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in mapping_hands],
+        dtype=np.float32)
+    mapping_handedness = np.array([0 if label == "Left" else 1 for label in mapping_labels],
+                                  dtype=np.int8)
+    mapping_engines = {n: make_mapping_engine(sinks.workdir, n) for n in MAPPING_COUNTS}
+    for n_mappings, mapping_engine in mapping_engines.items():
+        benchmarks.append((f"MappingEngine.evaluate[mapeos={n_mappings}]",
+                           lambda mapping_engine=mapping_engine: mapping_engine.evaluate(
+                               mapping_landmarks, mapping_handedness, w / h)))
+
+    # --- Frame completo (todo main() salvo MediaPipe y la ventana) ---
+    def make_full_frame(n_hands, n_pads, mapping_engine):
+        hands, labels = make_hands(n_hands)
+        results = SyntheticResults(hands, labels)
+        pads = make_pads(n_pads)
+        engine = make_pad_engine(pads)
+        publisher, recorder = sinks.get(n_pads)
+        stage_ms = [0.0] * len(cmv.STAGE_NAMES)
+        frame_clock = [0, 0.0]
+
+        def full_frame():
+            cmv.pads = pads
+            cmv.pad_engine = engine
+            cmv.mapping_engine = mapping_engine
+            frame_clock[0] += 1
+            frame_clock[1] += 1 / 60
+            frame_index, frame_time = frame_clock
+            recorder.begin_frame(frame_index)
+            out = cv2.flip(frame, 1)
+            out = cv2.convertScaleAbs(out, alpha=0.5, beta=0)
+            hand_data = cmv.collect_hand_data(results, w, h)
+            cmv.update_controls(hand_data, frame_time, w, h)
+            cmv.publish_frame(publisher, frame_index, frame_time, hand_data)
+            cmv.draw_interface(out, hand_data)
+            cmv.record_frame(recorder, frame_index, frame_time, hand_data, stage_ms)
+
+        return full_frame
+
+    default_mappings = make_mapping_engine(sinks.workdir)
+    for n_hands in HAND_COUNTS:
+        for n_pads in PAD_COUNTS:
+            benchmarks.append((f"frame_completo[hands={n_hands},pads={n_pads}]",
+                               make_full_frame(n_hands, n_pads, default_mappings)))
+
+    for n_mappings, mapping_engine in mapping_engines.items():
+        benchmarks.append((f"frame_completo[hands=2,pads=4,mapeos={n_mappings}]",
+                           make_full_frame(2, 4, mapping_engine)))
+
+    return benchmarks
+
+
+# ============================================
+# BASELINE JSON
+# ============================================
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'frame': [FRAME_WIDTH, FRAME_HEIGHT],
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline):
+    """Imprime la relación actual/baseline por benchmark. Devuelve las regresiones"""
+    regressions = []
+    print(f"\n{'benchmark':<58} {'base µs':>10} {'actual µs':>10} {'ratio':>7}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<58} {'-':>10} {result['median_us']:>10.2f}   nuevo")
+            continue
+        ratio = result['median_us'] / base['median_us']
+        mark = ""
+        if ratio > REGRESSION_THRESHOLD:
+            mark = "  ⚠️"
+            regressions.append(name)
+        elif ratio < 1 / REGRESSION_THRESHOLD:
+            mark = "  ✅"
+        print(f"{name:<58} {base['median_us']:>10.2f} {result['median_us']:>10.2f} {ratio:>6.2f}x{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks del controlador MIDI")
+    parser.add_argument('--save', metavar='JSON', help="Guardar resultados como baseline")
+    parser.add_argument('--compare', metavar='JSON', help="Comparar con una baseline anterior")
+    parser.add_argument('--filter', default='', help="Solo benchmarks que contengan este texto")
+    parser.add_argument('--repeats', type=int, default=7)
+    args = parser.parse_args()
+
+    # Sin MIDI real: los mensajes se descartan
+    cmv.midi_out = NullMidiOutput()
+    original_pads, original_engine = cmv.pads, cmv.pad_engine
+    original_mappings = cmv.mapping_engine
+    sinks = FrameSinks()
+
+    results = {}
+    print(f"⏱️  Benchmarks del controlador ({FRAME_WIDTH}x{FRAME_HEIGHT})")
+    try:
+        for name, func in build_benchmarks(sinks):
+            if args.filter not in name:
+                continue
+            # Los pads imprimen cada golpe: silenciar durante la medición
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = measure(func, repeats=args.repeats)
+            results[name] = result
+            print(f"  {name:<58} {result['median_us']:>10.2f} µs  (min {result['min_us']:.2f})")
+    finally:
+        cmv.pads, cmv.pad_engine = original_pads, original_engine
+        cmv.mapping_engine = original_mappings
+        sinks.close()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'])
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} benchmarks más lentos que la baseline "
+                  f"(>{(REGRESSION_THRESHOLD - 1) * 100:.0f}%)")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+        print(f"\n💾 Baseline guardada en {args.save}")
+
+
+if __name__ == "__main__":
+    main()
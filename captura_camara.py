@@ -0,0 +1,336 @@
+import os
+import sys
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# ============================================
+# CAPTURA DE CÁMARA
+# ============================================
+#
+# cv2.VideoCapture(0) con la configuración por defecto suele caer en
+# silencio a 30 fps YUYV sin comprimir aunque se pidan 60 fps a 720p
+# (el ancho de banda USB no alcanza). Este módulo abre la cámara con V4L2
+# de forma explícita, negocia FOURCC (MJPG primero, YUYV después),
+# resolución y FPS, lee de vuelta lo que el driver aceptó y mide la tasa
+# real entregada al arrancar.
+#
+# Cada frame lleva el timestamp del driver (instante de captura del buffer)
+# convertido a la base de time.monotonic(), así la latencia y el onset de
+# los pads se miden desde la exposición y no desde que read() volvió.
+#
+# Para pruebas sin cámara: FileSource (video) y SyntheticSource.
+
+CapturedFrame = namedtuple('CapturedFrame', ['image', 'index', 'timestamp', 'read_time'])
+
+DEFAULT_FOURCCS = ("MJPG", "YUYV")
+
+# Un timestamp del driver se acepta como reloj monotónico si queda entre
+# 0 y este valor antes de que read() vuelva
+MAX_DRIVER_LATENCY = 1.0  # Segundos
+
+# En modo 'offset', frames usados para estimar el offset; después queda fijo
+# (un offset que cambia en medio de la sesión hace saltar los timestamps)
+OFFSET_WARMUP_FRAMES = 30
+
+
+def fourcc_to_str(value):
+    """Código FOURCC numérico (CAP_PROP_FOURCC) → texto de 4 caracteres"""
+    value = int(value)
+    return "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00")
+
+
+class _DriverClock:
+    """Convierte timestamps del driver (ms) a la base de time.monotonic().
+
+    Con V4L2 los buffers llevan CLOCK_MONOTONIC, la misma base que
+    time.monotonic() en Linux: se usan tal cual. Si el backend entrega otra
+    base (p. ej. ms desde el inicio del stream), se estima el offset como el
+    mínimo de (read_time - driver_time) durante los primeros
+    OFFSET_WARMUP_FRAMES frames y después se congela: los frames quedan con un
+    sesgo constante pero sin el jitter de read(). Los timestamps devueltos
+    siempre avanzan.
+    """
+
+    def __init__(self):
+        self.mode = None     # 'driver', 'offset' o 'read' (se decide en el primer frame)
+        self.offset = None
+        self.anomalies = 0   # Timestamps ausentes o que no avanzan
+        self._offset_samples = 0
+        self._last = None    # (driver_time, read_time, timestamp) del frame anterior
+
+    def convert(self, driver_ms, read_time):
+        if self.mode == 'read':
+            return read_time
+
+        driver_time = driver_ms / 1000.0 if driver_ms else 0.0
+        if self.mode is None:
+            if driver_time <= 0:
+                # El backend no entrega timestamps: reloj de read() toda la sesión
+                self.mode = 'read'
+                return read_time
+            delay = read_time - driver_time
+            self.mode = 'driver' if 0 <= delay < MAX_DRIVER_LATENCY else 'offset'
+
+        if self._last is not None and driver_time <= self._last[0]:
+            # Timestamp ausente o repetido: se mantiene la base de tiempo y se
+            # avanza el anterior lo que avanzó read(), sin saltar a otra base
+            self.anomalies += 1
+            last_driver, last_read, last_timestamp = self._last
+            timestamp = last_timestamp + max(read_time - last_read, 1e-6)
+            self._last = (last_driver, read_time, timestamp)
+            return timestamp
+
+        if self.mode == 'driver':
+            timestamp = driver_time
+        else:
+            if self._offset_samples < OFFSET_WARMUP_FRAMES:
+                self._offset_samples += 1
+                offset = read_time - driver_time
+                if self.offset is None or offset < self.offset:
+                    self.offset = offset
+            timestamp = driver_time + self.offset
+        if self._last is not None:
+            # Si el offset bajó durante el warm-up, no volver hacia atrás
+            timestamp = max(timestamp, self._last[2] + 1e-6)
+        self._last = (driver_time, read_time, timestamp)
+        return timestamp
+
+
+class CameraSource:
+    """Cámara con formato negociado y frames con timestamp del driver"""
+
+    def __init__(self, device=0, width=1280, height=720, fps=60,
+                 fourccs=DEFAULT_FOURCCS, buffer_size=1, backend=None):
+        if backend is None:
+            # V4L2 explícito en Linux; en otros sistemas el backend por defecto
+            backend = cv2.CAP_V4L2 if sys.platform.startswith('linux') else cv2.CAP_ANY
+        self.device = device
+        self.requested = {'width': width, 'height': height, 'fps': fps}
+        self.cap = cv2.VideoCapture(device, backend)
+        self.clock = _DriverClock()
+        self.index = 0
+        self.mode = {}
+        self.measured_fps = None
+
+        if not self.cap.isOpened():
+            return
+
+        self._negotiate(width, height, fps, fourccs)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def _negotiate(self, width, height, fps, fourccs):
+        """Prueba cada FOURCC en orden y se queda con el primero que el driver acepta"""
+        for fourcc in fourccs:
+            # V4L2 aplica el formato antes que el tamaño: FOURCC primero
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+            self._read_back()
+            if self.mode['fourcc'] == fourcc:
+                return
+        # Ninguno aceptado: queda lo que el driver haya elegido
+
+    def _read_back(self):
+        self.mode = {
+            'backend': self.cap.getBackendName(),
+            'fourcc': fourcc_to_str(self.cap.get(cv2.CAP_PROP_FOURCC)),
+            'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': self.cap.get(cv2.CAP_PROP_FPS),
+        }
+
+    def read(self):
+        """Lee un frame. Devuelve CapturedFrame o None si no hubo frame"""
+        ok, image = self.cap.read()
+        read_time = time.monotonic()
+        if not ok:
+            return None
+        timestamp = self.clock.convert(self.cap.get(cv2.CAP_PROP_POS_MSEC), read_time)
+        self.index += 1
+        return CapturedFrame(image, self.index, timestamp, read_time)
+
+    def release(self):
+        self.cap.release()
+
+    def describe(self):
+        mode = self.mode
+        return (f"{mode.get('backend', '?')} {mode.get('fourcc', '?')} "
+                f"{mode.get('width', 0)}x{mode.get('height', 0)} @ {mode.get('fps', 0):.0f} fps")
+
+
+class FileSource:
+    """Video desde archivo con la misma interfaz que CameraSource.
+
+    Los timestamps salen de la posición del video (CAP_PROP_POS_MSEC).
+    Con realtime=True los frames se entregan a la velocidad original.
+    """
+
+    def __init__(self, path, realtime=True, loop=True):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        self.index = 0
+        self.measured_fps = None
+        self.mode = {
+            'backend': 'archivo',
+            'fourcc': fourcc_to_str(self.cap.get(cv2.CAP_PROP_FOURCC)),
+            'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': self.cap.get(cv2.CAP_PROP_FPS) or 30.0,
+        }
+        self._start = None
+        self._loop_offset = 0.0   # Duración acumulada de las vueltas anteriores
+        self._last_position = 0.0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        ok, image = self.cap.read()
+        if not ok and self.loop and self.index > 0:
+            self._loop_offset += self._last_position + 1.0 / self.mode['fps']
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, image = self.cap.read()
+        if not ok:
+            return None
+
+        position = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        self._last_position = position
+        position += self._loop_offset
+
+        if self._start is None:
+            self._start = time.monotonic() - position
+        if self.realtime:
+            delay = self._start + position - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        self.index += 1
+        return CapturedFrame(image, self.index, self._start + position, time.monotonic())
+
+    def release(self):
+        self.cap.release()
+
+    def describe(self):
+        return f"archivo {os.path.basename(self.path)} {self.mode['width']}x{self.mode['height']} @ {self.mode['fps']:.0f} fps"
+
+
+class SyntheticSource:
+    """Frames generados (gradiente + círculo en movimiento) a FPS exactos"""
+
+    def __init__(self, width=1280, height=720, fps=60, realtime=True):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.realtime = realtime
+        self.index = 0
+        self.measured_fps = None
+        self.mode = {'backend': 'sintetico', 'fourcc': 'BGR3',
+                     'width': width, 'height': height, 'fps': float(fps)}
+        gradient = np.linspace(40, 160, width, dtype=np.float32)
+        self._background = np.empty((height, width, 3), dtype=np.uint8)
+        self._background[:] = gradient.astype(np.uint8)[None, :, None]
+        self._start = None
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self._start is None:
+            self._start = time.monotonic()
+        timestamp = self._start + self.index / self.fps
+        if self.realtime:
+            delay = timestamp - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        image = self._background.copy()
+        phase = self.index / self.fps
+        center = (int(self.width * (0.5 + 0.35 * np.sin(phase * 2.0))),
+                  int(self.height * (0.5 + 0.30 * np.cos(phase * 1.3))))
+        cv2.circle(image, center, max(4, self.height // 12), (255, 255, 255), -1)
+
+        self.index += 1
+        return CapturedFrame(image, self.index, timestamp, time.monotonic())
+
+    def release(self):
+        pass
+
+    def describe(self):
+        return f"sintético {self.width}x{self.height} @ {self.fps:.0f} fps"
+
+
+def open_source(source=0, width=1280, height=720, fps=60, fourccs=DEFAULT_FOURCCS):
+    """Abre una fuente de video.
+
+    source: índice de cámara (int o "0"), ruta de un archivo de video o
+    "synthetic".
+    """
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if isinstance(source, int):
+        return CameraSource(source, width, height, fps, fourccs)
+    if source == "synthetic":
+        return SyntheticSource(width, height, fps)
+    return FileSource(source)
+
+
+def measure_fps(source, duration=1.0, warmup=5):
+    """Mide los FPS realmente entregados leyendo frames durante `duration` s.
+
+    Usa los timestamps de cada frame (no el reloj de read()). Guarda el
+    resultado en source.measured_fps y lo devuelve (None si no hubo frames).
+    """
+    for _ in range(warmup):
+        source.read()
+
+    timestamps = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        captured = source.read()
+        if captured is not None:
+            timestamps.append(captured.timestamp)
+
+    if len(timestamps) < 2 or timestamps[-1] <= timestamps[0]:
+        source.measured_fps = None
+    else:
+        source.measured_fps = (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+    return source.measured_fps
+
+
+def report(source, requested_fps=None):
+    """Imprime el modo negociado y avisa si la tasa real no llega a la pedida"""
+    print(f"📷 Captura: {source.describe()}")
+    clock = getattr(source, 'clock', None)
+    if clock is not None and clock.mode is not None:
+        origin = {'driver': "driver (monotónico)",
+                  'offset': "driver (offset estimado)",
+                  'read': "read() (el driver no entrega timestamp)"}[clock.mode]
+        print(f"   Timestamps: {origin}")
+        if clock.anomalies:
+            print(f"   ⚠️  {clock.anomalies} timestamps del driver ausentes o repetidos "
+                  f"(se interpolaron con read())")
+    if source.measured_fps is not None:
+        print(f"   FPS medidos: {source.measured_fps:.1f}")
+        if requested_fps and source.measured_fps < requested_fps * 0.9:
+            print(f"   ⚠️  Se pidieron {requested_fps} fps y la fuente entrega "
+                  f"{source.measured_fps:.1f} (¿formato sin comprimir o poca luz?)")
+
+
+if __name__ == "__main__":
+    source_arg = sys.argv[1] if len(sys.argv) > 1 else 0
+    capture = open_source(source_arg)
+    if not capture.isOpened():
+        print(f"❌ No se pudo abrir la fuente: {source_arg}")
+        sys.exit(1)
+    measure_fps(capture, duration=2.0)
+    report(capture, requested_fps=60)
+    capture.release()
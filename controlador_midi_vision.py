@@ -2,8 +2,17 @@ import cv2
 import mediapipe as mp
 import mido
 import numpy as np
+import os
+import sys
+import time
 from collections import deque
 
+from memoria_compartida import LandmarkPublisher, SHM_NAME
+from grabador_sesion import SessionRecorder, RecordingMidiOutput
+from motor_pads import PadEngine, NoteScheduler
+from motor_mapeos import MappingEngine
+from captura_camara import open_source, measure_fps, report
+
 # ============================================
 # CONFIGURACIÓN
 # ============================================
@@ -18,34 +27,87 @@ PAD_1_NOTE = 36  # C1 - Kick
 PAD_2_NOTE = 38  # D1 - Snare
 PAD_3_NOTE = 42  # F#1 - Hi-hat cerrado
 PAD_4_NOTE = 46  # A#1 - Hi-hat abierto
-PAD_VELOCITY = 100
+PAD_VELOCITY = 100  # Velocity por defecto (sin historial de movimiento)
+
+# Velocity según velocidad de acercamiento de la palma (ver motor_pads.py)
+# Velocidades en alturas de frame por segundo (independientes de la resolución)
+PAD_SPEED_MIN = 0.42      # ≈300 px/s a 720p → PAD_VELOCITY_MIN
+PAD_SPEED_MAX = 4.2       # ≈3000 px/s a 720p → PAD_VELOCITY_MAX
+PAD_VELOCITY_MIN = 30
+PAD_VELOCITY_MAX = 127
+PAD_VELOCITY_CURVE = 1.0  # <1 favorece golpes suaves, >1 exige golpes rápidos
+
+# Si MediaPipe pierde una mano por menos de este tiempo, al volver no
+# redispara el pad donde estaba apoyada
+PAD_DROPOUT_GRACE = 0.15  # Segundos
+
+# Las notas salen en (instante de cruce interpolado + latencia fija). Los
+# instantes se miden desde la exposición (timestamp del driver): la latencia
+# debe cubrir exposición → entrega + un frame + inferencia + lógica. Si no
+# alcanza, la nota ya está vencida al agendarse y vuelve el jitter de frame
+PAD_ONSET_LATENCY = 0.1   # Segundos (valor usado si no se calibra)
+PAD_ONSET_LATENCY_AUTO = True       # Calibrar al arrancar (exposición + inferencia)
+PAD_ONSET_CALIBRATION_FRAMES = 30
+PAD_ONSET_MARGIN = 0.01   # Segundos extra sobre el p95 medido (lógica + envío)
 
-# Configuración de cámara
+# Configuración de cámara (resolución pedida; la interfaz se adapta a la real)
 CAMERA_WIDTH = 1280
 CAMERA_HEIGHT = 720
+CAMERA_FPS = 60
+CAMERA_FOURCCS = ("MJPG", "YUYV")  # En orden de preferencia (ver captura_camara.py)
+CAMERA_FPS_CHECK_SECONDS = 1.0     # Medición de FPS reales al arrancar
+# Índice de cámara, ruta de un video o "synthetic" (también como argumento:
+# python controlador_midi_vision.py video.mp4)
+CAMERA_SOURCE = 0
+
+# ============================================
+# LAYOUT NORMALIZADO
+# ============================================
+# Posiciones verticales y tamaños en fracciones del ALTO del frame, anchos
+# horizontales en fracciones del ANCHO. La geometría en píxeles se compila
+# una vez cada vez que cambia la resolución (ver apply_resolution).
+# Los comentarios indican el equivalente en píxeles a 1280x720.
+
+LAYOUT_REFERENCE_HEIGHT = 720  # Textos y trazos escalan con alto / 720
 
 # Configuración de sliders (pinza)
-PINCH_MIN_DISTANCE = 20   # Distancia mínima de pinza (cerrada) = 0
-PINCH_MAX_DISTANCE = 200  # Distancia máxima de pinza (abierta) = 127
-SLIDER_BAR_HEIGHT = 60    # Altura de la barra visual
-SLIDER_BAR_WIDTH = 500    # Ancho de la barra visual
-SLIDER_Y_TOP = 150        # Posición Y del slider superior (mano izq)
-SLIDER_Y_BOTTOM = 250     # Posición Y del slider inferior (mano der)
+PINCH_MIN_DISTANCE = 0.028  # 20 px  - Distancia mínima de pinza (cerrada) = 0
+PINCH_MAX_DISTANCE = 0.278  # 200 px - Distancia máxima de pinza (abierta) = 127
+SLIDER_BAR_HEIGHT = 0.083   # 60 px  - Altura de la barra visual
+SLIDER_BAR_WIDTH = 0.3906   # 500 px - Ancho de la barra visual (fracción del ancho)
+SLIDER_Y_TOP = 0.208        # 150 px - Posición Y del slider superior (mano izq)
+SLIDER_Y_BOTTOM = 0.347     # 250 px - Posición Y del slider inferior (mano der)
 
 # Zona de activación de sliders - MEJORADA
-SLIDER_ACTIVATION_MARGIN = 100  # Reducido de 150 a 100
-SLIDER_MIN_Y = 80         # NUEVO: Límite superior de zona de sliders
-SLIDER_MAX_Y = 380        # NUEVO: Límite inferior de zona de sliders
+SLIDER_ACTIVATION_MARGIN = 0.139  # 100 px - Reducido de 150 a 100
+SLIDER_MIN_Y = 0.111        # 80 px  - Límite superior de zona de sliders
+SLIDER_MAX_Y = 0.528        # 380 px - Límite inferior de zona de sliders
 
 # Configuración de Pads - MEJORADA
-PAD_SIZE = 140            # Tamaño visual del pad
-PAD_TOUCH_AREA = 170      # Área de detección (reducido de 200 a 170)
-PAD_MARGIN = 50           # Margen desde las esquinas
-PAD_MIN_Y = 420           # NUEVO: Los pads solo funcionan DEBAJO de esta línea
+PAD_SIZE = 0.194            # 140 px - Tamaño visual del pad
+PAD_TOUCH_AREA = 0.236      # 170 px - Área de detección (diámetro)
+PAD_MARGIN = 0.069          # 50 px  - Margen desde las esquinas
+PAD_ROW_GAP = 0.028         # 20 px  - Separación entre filas de pads
+PAD_MIN_Y = 0.583           # 420 px - Los pads solo funcionan DEBAJO de esta línea
 
 # Configuración de suavizado
 SMOOTHING_WINDOW = 7      # Ventana de promediado móvil (más suavizado)
 
+# Memoria compartida (landmarks para otros procesos, ver memoria_compartida.py)
+SHARED_MEMORY_ENABLED = True
+SHARED_MEMORY_NAME = SHM_NAME
+
+# Mapeos declarativos gesto → MIDI (ver motor_mapeos.py)
+MAPPINGS_ENABLED = True
+MAPPINGS_FILE = "mapeos.json"
+MAPPINGS_RELOAD_INTERVAL = 60  # Frames entre chequeos de cambios del archivo
+
+# Grabador de sesión (ver grabador_sesion.py)
+RECORDING_ENABLED = True
+RECORDING_DIR = "sesiones"   # Se crea un subdirectorio por sesión
+STAGE_NAMES = ("captura", "inferencia", "logica", "render", "display",
+               "exposicion")  # exposicion: exposición → read() devuelve el frame
+
 # Colores vibrantes y fuertes
 SLIDER_BG_COLOR = (20, 20, 20)
 SLIDER_BORDER_LEFT = (255, 0, 255)    # Magenta fuerte
@@ -68,86 +130,12 @@ HAND_RIGHT_COLOR = (0, 200, 255)      # Cyan
 PINCH_LINE_COLOR = (255, 255, 0)      # Amarillo
 
 # ============================================
-# INICIALIZACIÓN MIDI
+# ESCALA DE LA INTERFAZ
 # ============================================
 
-print("🎛️  CONTROLADOR MIDI MEJORADO - 2 PINZAS + 4 PADS")
-print("=" * 65)
-
-# Buscar puerto MIDI (IAC Driver en Mac)
-ports = mido.get_output_names()
-print("\n📡 Puertos MIDI disponibles:")
-for i, p in enumerate(ports):
-    print(f"  {i+1}. {p}")
-
-port_name = None
-for p in ports:
-    if "IAC" in p or "Bus" in p:
-        port_name = p
-        break
-
-if not port_name and ports:
-    port_name = ports[0]
-
-if not port_name:
-    print("\n❌ No se encontró ningún puerto MIDI")
-    print("💡 Habilita IAC Driver en 'Configuración MIDI de Audio'")
-    exit()
-
-try:
-    midi_out = mido.open_output(port_name)
-    print(f"\n✅ MIDI conectado: {port_name}")
-    print(f"\n🤏 SLIDERS (Control con Pinza - ZONA SUPERIOR):")
-    print(f"   Mano IZQUIERDA (Magenta) → CC#{SLIDER_LEFT_CC}")
-    print(f"   Mano DERECHA (Cyan) → CC#{SLIDER_RIGHT_CC}")
-    print(f"   ⚠️  Solo funcionan en la ZONA SUPERIOR (barras iluminadas)")
-    print(f"\n🥁 PADS (Notas MIDI - ZONA INFERIOR):")
-    print(f"   Pad 1 (Rojo) → Nota {PAD_1_NOTE} (C1)")
-    print(f"   Pad 2 (Azul) → Nota {PAD_2_NOTE} (D1)")
-    print(f"   Pad 3 (Amarillo) → Nota {PAD_3_NOTE} (F#1)")
-    print(f"   Pad 4 (Verde) → Nota {PAD_4_NOTE} (A#1)")
-    print(f"   ⚠️  Solo funcionan en la ZONA INFERIOR (círculos abajo)")
-except Exception as e:
-    print(f"\n❌ Error al abrir puerto MIDI: {e}")
-    exit()
-
-# ============================================
-# INICIALIZACIÓN MEDIAPIPE
-# ============================================
-
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=2,  # Dos manos para controlar dos sliders
-    min_detection_confidence=0.7,
-    min_tracking_confidence=0.8,
-    model_complexity=1
-)
-
-# ============================================
-# INICIALIZACIÓN CÁMARA
-# ============================================
-
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
-cap.set(cv2.CAP_PROP_FPS, 60)
-cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-
-if not cap.isOpened():
-    print("\n❌ No se pudo abrir la cámara")
-    exit()
-
-print("✅ Cámara iniciada")
-print("\n📝 Instrucciones:")
-print("   • SLIDERS: Haz gesto de PINZA en la ZONA SUPERIOR")
-print("     - La zona está claramente marcada con rectángulos")
-print("     - Cerrada = 0 | Abierta = 127")
-print("   • PADS: Coloca la PALMA en la ZONA INFERIOR")
-print("     - Solo funcionan DEBAJO de la línea amarilla")
-print("     - Zonas totalmente SEPARADAS para evitar confusión")
-print("   • Presiona 'q' o 'ESC' para salir")
-print("=" * 65)
+def ui_size(value, scale):
+    """Escala un tamaño en píxeles de referencia (720p) a la resolución actual"""
+    return max(1, int(round(value * scale)))
 
 # ============================================
 # CLASE SLIDER (PINZA)
@@ -155,27 +143,16 @@ print("=" * 65)
 
 class PinchSlider:
     def __init__(self, y_position, cc_number, label, color_border, color_fill, hand_type):
-        self.y = y_position
+        self.y_norm = y_position  # Fracción del alto del frame
         self.cc_number = cc_number
         self.label = label
         self.color_border = color_border
         self.color_fill = color_fill
         self.hand_type = hand_type  # "Left" o "Right"
         
-        # Calcular X centrado
-        self.x = (CAMERA_WIDTH - SLIDER_BAR_WIDTH) // 2
-        self.width = SLIDER_BAR_WIDTH
-        self.height = SLIDER_BAR_HEIGHT
-        
-        # Definir zona de activación (área donde la pinza activa el slider)
-        self.activation_x_min = self.x - SLIDER_ACTIVATION_MARGIN
-        self.activation_x_max = self.x + self.width + SLIDER_ACTIVATION_MARGIN
-        self.activation_y_min = max(SLIDER_MIN_Y, self.y - SLIDER_ACTIVATION_MARGIN)
-        self.activation_y_max = min(SLIDER_MAX_Y, self.y + self.height + SLIDER_ACTIVATION_MARGIN)
-        
         # Valor actual (0-127)
         self.value = 0
-        self.pinch_distance = 0
+        self.pinch_distance = 0  # En alturas de frame
         
         # Estado
         self.is_active = False
@@ -188,17 +165,90 @@ class PinchSlider:
         
         # Último valor enviado por MIDI
         self.last_sent_value = -1
+        
+        # Geometría en píxeles (se recompila si cambia la resolución)
+        self.set_geometry(CAMERA_WIDTH, CAMERA_HEIGHT)
+    
+    def set_geometry(self, w, h):
+        """Compila la geometría en píxeles y las posiciones de texto para un frame w x h"""
+        scale = h / LAYOUT_REFERENCE_HEIGHT
+        self.frame_height = h
+        self.scale = scale
+        
+        # Calcular X centrado
+        self.width = int(round(SLIDER_BAR_WIDTH * w))
+        self.height = int(round(SLIDER_BAR_HEIGHT * h))
+        self.x = (w - self.width) // 2
+        self.y = int(round(self.y_norm * h))
+        
+        # Definir zona de activación (área donde la pinza activa el slider)
+        margin = int(round(SLIDER_ACTIVATION_MARGIN * h))
+        self.activation_x_min = self.x - margin
+        self.activation_x_max = self.x + self.width + margin
+        self.activation_y_min = max(int(round(SLIDER_MIN_Y * h)), self.y - margin)
+        self.activation_y_max = min(int(round(SLIDER_MAX_Y * h)), self.y + self.height + margin)
+        
+        # La misma zona en coordenadas normalizadas (hit-test sin convertir a int)
+        self.zone_x_min = self.activation_x_min / w
+        self.zone_x_max = self.activation_x_max / w
+        self.zone_y_min = self.activation_y_min / h
+        self.zone_y_max = self.activation_y_max / h
+        
+        # Grosor de trazos y tamaños de fuente
+        self.thin = ui_size(2, scale)
+        self.thick = ui_size(3, scale)
+        self.thicker = ui_size(4, scale)
+        self.font_label = 0.7 * scale
+        self.font_hand = 0.6 * scale
+        self.font_value = 1.2 * scale
+        self.font_mark = 0.4 * scale
+        self.font_distance = 0.5 * scale
+        
+        # Texto indicador de zona (solo el slider superior)
+        self.zone_title = None
+        if self.y_norm == SLIDER_Y_TOP:
+            zone_text = "ZONA DE SLIDERS (EFECTOS)"
+            text_size = cv2.getTextSize(zone_text, cv2.FONT_HERSHEY_SIMPLEX,
+                                        self.font_label, self.thin)[0]
+            text_x = (w - text_size[0]) // 2
+            zone_top = int(round(SLIDER_MIN_Y * h))
+            self.zone_title = (
+                zone_text,
+                (text_x, zone_top - ui_size(12, scale)),
+                # Fondo negro para el texto
+                (text_x - ui_size(10, scale), zone_top - ui_size(35, scale)),
+                (text_x + text_size[0] + ui_size(10, scale), zone_top - ui_size(5, scale)),
+            )
+        
+        self.label_pos = (self.x, self.y - ui_size(15, scale))
+        self.hand_label_pos = (self.x + self.width - ui_size(150, scale), self.y - ui_size(15, scale))
+        self.value_pos = (self.x - ui_size(60, scale), self.y + ui_size(45, scale))
+        self.distance_pos = (self.x + self.width // 2 - ui_size(80, scale),
+                             self.y + self.height // 2 + ui_size(8, scale))
+        
+        # Marcas de nivel: (x, texto, posición del texto)
+        self.marks = []
+        for mark_x_rel, mark_text in zip([0, self.width // 2, self.width], ["0", "64", "127"]):
+            mark_x = self.x + mark_x_rel
+            text_size = cv2.getTextSize(mark_text, cv2.FONT_HERSHEY_SIMPLEX,
+                                        self.font_mark, 1)[0]
+            self.marks.append((mark_x, mark_text,
+                               (mark_x - text_size[0] // 2,
+                                self.y + self.height + ui_size(25, scale))))
     
     def is_in_activation_zone(self, x, y):
-        """Verifica si una posición está dentro de la zona de activación del slider"""
-        in_x = self.activation_x_min <= x <= self.activation_x_max
-        in_y = self.activation_y_min <= y <= self.activation_y_max
+        """Verifica si una posición normalizada está dentro de la zona de activación del slider"""
+        in_x = self.zone_x_min <= x <= self.zone_x_max
+        in_y = self.zone_y_min <= y <= self.zone_y_max
         # CRÍTICO: No activar si está en zona de pads
         not_in_pad_zone = y < PAD_MIN_Y
         return in_x and in_y and not_in_pad_zone
     
     def update_from_pinch(self, distance, pinch_center_x, pinch_center_y):
-        """Actualiza el valor basado en la distancia de pinza (solo si está en zona)"""
+        """Actualiza el valor basado en la distancia de pinza (solo si está en zona).
+        
+        Distancia en alturas de frame y centro de la pinza normalizado (0-1).
+        """
         # Verificar si está en zona de activación
         self.is_in_zone = self.is_in_activation_zone(pinch_center_x, pinch_center_y)
         
@@ -234,6 +284,8 @@ class PinchSlider:
     
     def draw(self, frame):
         """Dibuja el slider horizontal en el frame"""
+        scale = self.scale
+        
         # Dibujar zona de activación (más visible cuando está activa)
         if self.is_in_zone:
             zone_alpha = 0.25
@@ -248,36 +300,31 @@ class PinchSlider:
         cv2.addWeighted(zone_overlay, zone_alpha, frame, 1-zone_alpha, 0, frame)
         
         # Borde de zona de activación
-        border_thickness = 3 if self.is_in_zone else 2
+        border_thickness = self.thick if self.is_in_zone else self.thin
         cv2.rectangle(frame,
                      (self.activation_x_min, self.activation_y_min),
                      (self.activation_x_max, self.activation_y_max),
                      self.color_border, border_thickness)
         
         # Texto indicador de zona
-        if self.y == SLIDER_Y_TOP:
-            zone_text = "ZONA DE SLIDERS (EFECTOS)"
-            text_size = cv2.getTextSize(zone_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
-            text_x = (CAMERA_WIDTH - text_size[0]) // 2
+        if self.zone_title is not None:
+            zone_text, text_pos, bg_top_left, bg_bottom_right = self.zone_title
             
             # Fondo negro para el texto
-            cv2.rectangle(frame,
-                         (text_x - 10, SLIDER_MIN_Y - 35),
-                         (text_x + text_size[0] + 10, SLIDER_MIN_Y - 5),
-                         (0, 0, 0), -1)
+            cv2.rectangle(frame, bg_top_left, bg_bottom_right, (0, 0, 0), -1)
             
-            cv2.putText(frame, zone_text,
-                       (text_x, SLIDER_MIN_Y - 12),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            cv2.putText(frame, zone_text, text_pos,
+                       cv2.FONT_HERSHEY_SIMPLEX, self.font_label, (255, 255, 255), self.thin)
         
         # Fondo oscuro del slider
+        pad = ui_size(5, scale)
         cv2.rectangle(frame,
-                     (self.x - 5, self.y - 5),
-                     (self.x + self.width + 5, self.y + self.height + 5),
+                     (self.x - pad, self.y - pad),
+                     (self.x + self.width + pad, self.y + self.height + pad),
                      (10, 10, 10), -1)
         
         # Borde del slider
-        thickness = 4 if self.is_active else 3
+        thickness = self.thicker if self.is_active else self.thick
         cv2.rectangle(frame,
                      (self.x, self.y),
                      (self.x + self.width, self.y + self.height),
@@ -288,76 +335,68 @@ class PinchSlider:
         
         # Relleno del slider (de izquierda a derecha)
         if fill_width > 0:
+            inset = ui_size(3, scale)
             cv2.rectangle(frame,
-                         (self.x + 3, self.y + 3),
-                         (self.x + fill_width - 3, self.y + self.height - 3),
+                         (self.x + inset, self.y + inset),
+                         (self.x + fill_width - inset, self.y + self.height - inset),
                          self.color_fill, -1)
         
         # Línea indicadora del valor actual
         indicator_x = self.x + fill_width
         if fill_width > 0:
+            overshoot = ui_size(10, scale)
             cv2.line(frame,
-                    (indicator_x, self.y - 10),
-                    (indicator_x, self.y + self.height + 10),
-                    (255, 255, 255), 3)
+                    (indicator_x, self.y - overshoot),
+                    (indicator_x, self.y + self.height + overshoot),
+                    (255, 255, 255), self.thick)
         
         # Valor numérico (a la izquierda)
         value_text = f"{self.value}"
-        cv2.putText(frame, value_text,
-                   (self.x - 60, self.y + 45),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 3)
+        cv2.putText(frame, value_text, self.value_pos,
+                   cv2.FONT_HERSHEY_SIMPLEX, self.font_value, (255, 255, 255), self.thick)
         
         # Etiqueta (arriba del slider)
         label_text = f"{self.label} - CC{self.cc_number}"
-        cv2.putText(frame, label_text,
-                   (self.x, self.y - 15),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, self.color_border, 2)
+        cv2.putText(frame, label_text, self.label_pos,
+                   cv2.FONT_HERSHEY_SIMPLEX, self.font_label, self.color_border, self.thin)
         
         # Etiqueta de mano
         hand_label = "MANO IZQ" if self.hand_type == "Left" else "MANO DER"
-        cv2.putText(frame, hand_label,
-                   (self.x + self.width - 150, self.y - 15),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, self.color_border, 2)
+        cv2.putText(frame, hand_label, self.hand_label_pos,
+                   cv2.FONT_HERSHEY_SIMPLEX, self.font_hand, self.color_border, self.thin)
         
         # Marcas de nivel
-        marks = [0, self.width // 2, self.width]
-        mark_values = ["0", "64", "127"]
-        for mark_x_rel, mark_text in zip(marks, mark_values):
-            mark_x = self.x + mark_x_rel
+        mark_len = ui_size(8, scale)
+        for mark_x, mark_text, text_pos in self.marks:
             cv2.line(frame,
                     (mark_x, self.y + self.height),
-                    (mark_x, self.y + self.height + 8),
-                    (100, 100, 100), 2)
-            text_size = cv2.getTextSize(mark_text, cv2.FONT_HERSHEY_SIMPLEX, 0.4, 1)[0]
-            cv2.putText(frame, mark_text,
-                       (mark_x - text_size[0] // 2, self.y + self.height + 25),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (150, 150, 150), 1)
+                    (mark_x, self.y + self.height + mark_len),
+                    (100, 100, 100), self.thin)
+            cv2.putText(frame, mark_text, text_pos,
+                       cv2.FONT_HERSHEY_SIMPLEX, self.font_mark, (150, 150, 150), 1)
         
         # Si está activo, mostrar distancia de pinza
         if self.is_active:
-            distance_text = f"Pinza: {int(self.pinch_distance)}px"
-            cv2.putText(frame, distance_text,
-                       (self.x + self.width // 2 - 80, self.y + self.height // 2 + 8),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+            distance_text = f"Pinza: {int(self.pinch_distance * self.frame_height)}px"
+            cv2.putText(frame, distance_text, self.distance_pos,
+                       cv2.FONT_HERSHEY_SIMPLEX, self.font_distance, (200, 200, 200), 1)
 
 # ============================================
 # CLASE PAD (CON DEBOUNCING)
 # ============================================
 
 class Pad:
-    def __init__(self, x, y, size, touch_area, note, label, color):
-        self.x = x
-        self.y = y
-        self.size = size
-        self.touch_area = touch_area
+    def __init__(self, center_x, center_y, size, touch_area, note, label, color):
+        """Centro normalizado (x en fracción del ancho, y del alto); tamaño y
+        área de detección (diámetro) en fracciones del alto del frame."""
+        self.center_x_norm = center_x
+        self.center_y_norm = center_y
+        self.size_norm = size
+        self.touch_area_norm = touch_area
         self.note = note
         self.label = label
         self.color = color
         
-        # Calcular centro del pad
-        self.center_x = x + size // 2
-        self.center_y = y + size // 2
-        
         # Estado
         self.is_active = False
         self.was_touching = False
@@ -367,21 +406,68 @@ class Pad:
         # NUEVO: Debouncing
         self.last_trigger_time = 0
         self.debounce_time = 0.12  # 120ms entre triggers
+        
+        # Golpes acumulados (para el grabador de sesión)
+        self.trigger_count = 0
+        
+        # Geometría en píxeles (se recompila si cambia la resolución)
+        self.set_geometry(CAMERA_WIDTH, CAMERA_HEIGHT)
+    
+    def set_geometry(self, w, h):
+        """Compila la geometría en píxeles y la tabla de hit-test para un frame w x h"""
+        scale = h / LAYOUT_REFERENCE_HEIGHT
+        self.scale = scale
+        
+        # Rectángulo y centro del pad en píxeles (para dibujar)
+        self.size = int(round(self.size_norm * h))
+        self.touch_area = int(round(self.touch_area_norm * h))
+        self.center_x = int(round(self.center_x_norm * w))
+        self.center_y = int(round(self.center_y_norm * h))
+        self.x = self.center_x - self.size // 2
+        self.y = self.center_y - self.size // 2
+        
+        # Hit-test en espacio normalizado isotrópico (x escalada por el aspecto)
+        self.aspect = w / h
+        self.hit_center_x = self.center_x_norm * self.aspect
+        self.hit_radius_sq = (self.touch_area_norm / 2) ** 2
+        
+        # Grosor de trazos y posiciones de texto
+        self.touch_thickness = ui_size(2, scale)
+        self.border_thin = ui_size(5, scale)
+        self.border_thick = ui_size(8, scale)
+        self.glow_size = ui_size(35, scale)
+        self.glow_step = ui_size(10, scale)
+        
+        self.font_label = 1.0 * scale
+        self.label_thickness = ui_size(3, scale)
+        self.shadow_thickness = ui_size(5, scale)
+        self.shadow_offset = ui_size(3, scale)
+        label_size = cv2.getTextSize(self.label, cv2.FONT_HERSHEY_SIMPLEX,
+                                     self.font_label, self.label_thickness)[0]
+        self.label_pos = (self.x + (self.size - label_size[0]) // 2,
+                          self.y + (self.size + label_size[1]) // 2)
+        
+        self.note_text = f"N:{self.note}"
+        self.font_note = 0.6 * scale
+        self.note_thickness = ui_size(2, scale)
+        note_size = cv2.getTextSize(self.note_text, cv2.FONT_HERSHEY_SIMPLEX,
+                                    self.font_note, self.note_thickness)[0]
+        self.note_pos = (self.x + (self.size - note_size[0]) // 2,
+                         self.y + self.size - ui_size(15, scale))
     
     def check_touch_with_palm(self, palm_x, palm_y):
-        """Verifica si la palma de la mano está tocando el pad"""
+        """Verifica si la palma de la mano (coordenadas normalizadas) está tocando el pad"""
         # CRÍTICO: Solo funcionar en zona de pads (debajo de la línea)
         if palm_y < PAD_MIN_Y:
             self.was_touching = False
             return False
         
-        # Calcular distancia al centro del pad
-        dx = palm_x - self.center_x
-        dy = palm_y - self.center_y
-        distance = (dx**2 + dy**2)**0.5
+        # Distancia al centro del pad (al cuadrado, sin raíz)
+        dx = palm_x * self.aspect - self.hit_center_x
+        dy = palm_y - self.center_y_norm
         
         # Área circular de detección
-        is_touching = distance < (self.touch_area / 2)
+        is_touching = dx * dx + dy * dy < self.hit_radius_sq
         
         # Detectar momento del toque (flanco de subida)
         if is_touching and not self.was_touching:
@@ -390,10 +476,13 @@ class Pad:
         self.was_touching = is_touching
         return is_touching
     
-    def trigger(self):
-        """Activa el pad y envía nota MIDI (con debouncing)"""
-        import time
-        current_time = time.time()
+    def trigger(self, velocity=PAD_VELOCITY, onset_time=None):
+        """Activa el pad y envía nota MIDI (con debouncing).
+        
+        onset_time: instante real del golpe (time.monotonic()). Con agenda de
+        notas, la nota sale en onset_time + pad_onset_latency.
+        """
+        current_time = time.monotonic() if onset_time is None else onset_time
         
         # DEBOUNCING: Evitar triggers múltiples
         if current_time - self.last_trigger_time < self.debounce_time:
@@ -401,29 +490,47 @@ class Pad:
         
         self.last_trigger_time = current_time
         self.is_active = True
-        self.activation_time = current_time
+        self.trigger_count += 1
+        self.activation_time = time.monotonic()
         
-        # Enviar Note ON
         msg_on = mido.Message('note_on',
                              channel=MIDI_CHANNEL,
                              note=self.note,
-                             velocity=PAD_VELOCITY)
-        midi_out.send(msg_on)
+                             velocity=velocity)
+        
+        if note_scheduler is not None:
+            # Note ON y OFF agendados: el jitter de frame se vuelve latencia fija
+            note_time = current_time + pad_onset_latency
+            msg_off = mido.Message('note_off',
+                                  channel=MIDI_CHANNEL,
+                                  note=self.note,
+                                  velocity=0)
+            late = note_scheduler.schedule(note_time, msg_on)
+            # Un re-golpe reemplaza el note_off pendiente (si no, cortaría la nota nueva)
+            note_scheduler.schedule(note_time + self.activation_duration, msg_off,
+                                    key=('pad_off', self.note))
+        else:
+            # Enviar Note ON (el note off sale en update)
+            midi_out.send(msg_on)
         
-        print(f"🥁 {self.label} → Nota {self.note}")
+        if note_scheduler is not None and late:
+            print(f"🥁 {self.label} → Nota {self.note} (vel {velocity}) "
+                  f"⚠️  tarde: latencia de onset insuficiente")
+        else:
+            print(f"🥁 {self.label} → Nota {self.note} (vel {velocity})")
     
     def update(self):
         """Actualiza el estado del pad (para animación y note off)"""
-        import time
         if self.is_active:
-            elapsed = time.time() - self.activation_time
+            elapsed = time.monotonic() - self.activation_time
             
             if elapsed > self.activation_duration:
-                msg_off = mido.Message('note_off',
-                                      channel=MIDI_CHANNEL,
-                                      note=self.note,
-                                      velocity=0)
-                midi_out.send(msg_off)
+                if note_scheduler is None:
+                    msg_off = mido.Message('note_off',
+                                          channel=MIDI_CHANNEL,
+                                          note=self.note,
+                                          velocity=0)
+                    midi_out.send(msg_off)
                 self.is_active = False
     
     def draw(self, frame):
@@ -436,26 +543,27 @@ class Pad:
         
         # Borde del área de detección
         cv2.circle(frame, (self.center_x, self.center_y),
-                  self.touch_area // 2, self.color, 2)
+                  self.touch_area // 2, self.color, self.touch_thickness)
         
         # Color del pad según estado
         if self.is_active:
             pad_color = PAD_ACTIVE_COLOR
-            border_thickness = 8
-            glow_size = 35
+            border_thickness = self.border_thick
+            glow_size = self.glow_size
         else:
             pad_color = self.color
-            border_thickness = 5
+            border_thickness = self.border_thin
             glow_size = 0
         
         # Efecto de brillo cuando está activo
         if glow_size > 0:
+            step = self.glow_step
             for i in range(3):
                 alpha = 0.3 - (i * 0.1)
                 glow_overlay = frame.copy()
                 cv2.rectangle(glow_overlay,
-                            (self.x - glow_size + i*10, self.y - glow_size + i*10),
-                            (self.x + self.size + glow_size - i*10, self.y + self.size + glow_size - i*10),
+                            (self.x - glow_size + i*step, self.y - glow_size + i*step),
+                            (self.x + self.size + glow_size - i*step, self.y + self.size + glow_size - i*step),
                             pad_color, -1)
                 cv2.addWeighted(glow_overlay, alpha, frame, 1-alpha, 0, frame)
         
@@ -472,29 +580,20 @@ class Pad:
                      (255, 255, 255), border_thickness)
         
         # Etiqueta centrada (más grande)
-        label_size = cv2.getTextSize(self.label, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 3)[0]
-        label_x = self.x + (self.size - label_size[0]) // 2
-        label_y = self.y + (self.size + label_size[1]) // 2
+        label_x, label_y = self.label_pos
         
         # Sombra del texto
         cv2.putText(frame, self.label,
-                   (label_x + 3, label_y + 3),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 5)
+                   (label_x + self.shadow_offset, label_y + self.shadow_offset),
+                   cv2.FONT_HERSHEY_SIMPLEX, self.font_label, (0, 0, 0), self.shadow_thickness)
         
         # Texto principal
-        cv2.putText(frame, self.label,
-                   (label_x, label_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 3)
+        cv2.putText(frame, self.label, self.label_pos,
+                   cv2.FONT_HERSHEY_SIMPLEX, self.font_label, (0, 0, 0), self.label_thickness)
         
         # Número de nota (abajo)
-        note_text = f"N:{self.note}"
-        note_size = cv2.getTextSize(note_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-        note_x = self.x + (self.size - note_size[0]) // 2
-        note_y = self.y + self.size - 15
-        
-        cv2.putText(frame, note_text,
-                   (note_x, note_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+        cv2.putText(frame, self.note_text, self.note_pos,
+                   cv2.FONT_HERSHEY_SIMPLEX, self.font_note, (0, 0, 0), self.note_thickness)
 
 # ============================================
 # CREAR SLIDERS Y PADS
@@ -507,28 +606,111 @@ sliders = [
                 SLIDER_BORDER_RIGHT, SLIDER_FILL_RIGHT, "Right")
 ]
 
+# Centros normalizados de los pads. Los márgenes están en alturas de frame,
+# así que en X se convierten con el aspecto de referencia (16:9)
+reference_aspect = CAMERA_WIDTH / CAMERA_HEIGHT
+pad_x_left = (PAD_MARGIN + PAD_SIZE / 2) / reference_aspect
+pad_x_right = 1 - pad_x_left
+
 # Reposicionar pads más abajo para mayor separación
-pad_y_top = CAMERA_HEIGHT - 2*PAD_MARGIN - 2*PAD_SIZE - 20
-pad_y_bottom = CAMERA_HEIGHT - PAD_MARGIN - PAD_SIZE
+pad_y_top = 1 - 2*PAD_MARGIN - 1.5*PAD_SIZE - PAD_ROW_GAP
+pad_y_bottom = 1 - PAD_MARGIN - PAD_SIZE / 2
 
 pads = [
     # Pad 1 - Inferior Izquierda (Kick - Rojo)
-    Pad(PAD_MARGIN, pad_y_top, PAD_SIZE, PAD_TOUCH_AREA, 
+    Pad(pad_x_left, pad_y_top, PAD_SIZE, PAD_TOUCH_AREA, 
         PAD_1_NOTE, "PAD 1", PAD_COLORS[0]),
     
     # Pad 2 - Inferior Derecha (Snare - Azul)
-    Pad(CAMERA_WIDTH - PAD_MARGIN - PAD_SIZE, pad_y_top, PAD_SIZE, PAD_TOUCH_AREA,
+    Pad(pad_x_right, pad_y_top, PAD_SIZE, PAD_TOUCH_AREA,
         PAD_2_NOTE, "PAD 2", PAD_COLORS[1]),
     
     # Pad 3 - Más Inferior Izquierda (Hi-hat cerrado - Amarillo)
-    Pad(PAD_MARGIN, pad_y_bottom, PAD_SIZE, PAD_TOUCH_AREA,
+    Pad(pad_x_left, pad_y_bottom, PAD_SIZE, PAD_TOUCH_AREA,
         PAD_3_NOTE, "PAD 3", PAD_COLORS[2]),
     
     # Pad 4 - Más Inferior Derecha (Hi-hat abierto - Verde)
-    Pad(CAMERA_WIDTH - PAD_MARGIN - PAD_SIZE, pad_y_bottom, PAD_SIZE, PAD_TOUCH_AREA,
+    Pad(pad_x_right, pad_y_bottom, PAD_SIZE, PAD_TOUCH_AREA,
         PAD_4_NOTE, "PAD 4", PAD_COLORS[3])
 ]
 
+# ============================================
+# MOTOR DE PADS
+# ============================================
+
+def build_pad_engine(pads, aspect):
+    """Crea el motor de pads en espacio normalizado isotrópico (x * aspecto, y)"""
+    return PadEngine(
+        [(pad.center_x_norm * aspect, pad.center_y_norm) for pad in pads],
+        [pad.touch_area_norm / 2 for pad in pads],
+        min_y=PAD_MIN_Y,
+        dropout_grace=PAD_DROPOUT_GRACE,
+        speed_min=PAD_SPEED_MIN,
+        speed_max=PAD_SPEED_MAX,
+        velocity_min=PAD_VELOCITY_MIN,
+        velocity_max=PAD_VELOCITY_MAX,
+        velocity_curve=PAD_VELOCITY_CURVE,
+        default_velocity=PAD_VELOCITY)
+
+# Depende del aspecto del frame: se compila en apply_resolution
+pad_engine = None
+
+# ============================================
+# ESTADO GLOBAL (se inicializa en main)
+# ============================================
+
+midi_out = None          # Puerto MIDI de salida
+note_scheduler = None    # Agenda de notas de los pads
+mapping_engine = None    # Motor de mapeos declarativos
+pad_onset_latency = PAD_ONSET_LATENCY  # Calibrada en main (calibrate_onset_latency)
+
+# Buffers preasignados para evaluar los mapeos en lote
+mapping_landmarks = np.zeros((2, 21, 3), dtype=np.float32)
+mapping_handedness = np.full(2, -1, dtype=np.int8)
+
+def send_mapping_messages(cc_messages, note_on_messages, note_off_messages):
+    """Envía los mensajes (canal, número, valor) producidos por el motor de mapeos"""
+    for channel, number, value in note_off_messages:
+        midi_out.send(mido.Message('note_off', channel=channel, note=number, velocity=0))
+    for channel, number, value in cc_messages:
+        midi_out.send(mido.Message('control_change', channel=channel, control=number, value=value))
+    for channel, number, value in note_on_messages:
+        midi_out.send(mido.Message('note_on', channel=channel, note=number, velocity=value))
+
+def calibrate_onset_latency(cap, hands, n_frames=PAD_ONSET_CALIBRATION_FRAMES, warmup=5):
+    """Latencia de onset = p95(exposición → frame inferido) + un frame + margen.
+
+    El cruce interpolado puede caer hasta un frame antes del timestamp del
+    frame actual, de ahí el intervalo de frame extra. Devuelve
+    (latencia, p95 medido) o (PAD_ONSET_LATENCY, None) si no hubo frames.
+    """
+    samples = []
+    for i in range(n_frames + warmup):
+        captured = cap.read()
+        if captured is None:
+            continue
+        # Mismo preprocesado que el loop principal
+        frame = cv2.convertScaleAbs(cv2.flip(captured.image, 1), alpha=0.5, beta=0)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb.flags.writeable = False
+        hands.process(rgb)
+        if i >= warmup:  # Las primeras inferencias incluyen la carga del modelo
+            samples.append(time.monotonic() - captured.timestamp)
+
+    if not samples:
+        return PAD_ONSET_LATENCY, None
+    fps = cap.measured_fps or cap.mode.get('fps') or 30.0
+    measured = float(np.percentile(samples, 95))
+    return measured + 1.0 / fps + PAD_ONSET_MARGIN, measured
+
+def reload_mappings():
+    """Recarga el archivo de mapeos sin reiniciar (conserva el set si hay error)"""
+    try:
+        send_mapping_messages([], [], mapping_engine.reload())
+        print(f"🔄 Mapeos recargados: {', '.join(mapping_engine.order)}")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️  Error al recargar mapeos: {e}")
+
 # ============================================
 # FUNCIONES DE DETECCIÓN
 # ============================================
@@ -564,254 +746,662 @@ def get_palm_center(hand_landmarks, w, h):
     
     return palm_x, palm_y
 
+def get_pinch_normalized(hand_landmarks, aspect):
+    """Pinza en espacio normalizado: distancia en alturas de frame y centro (0-1)"""
+    thumb_tip = hand_landmarks.landmark[4]
+    index_tip = hand_landmarks.landmark[8]
+    
+    dx = (thumb_tip.x - index_tip.x) * aspect
+    dy = thumb_tip.y - index_tip.y
+    distance = (dx * dx + dy * dy) ** 0.5
+    
+    return distance, ((thumb_tip.x + index_tip.x) / 2, (thumb_tip.y + index_tip.y) / 2)
+
+def get_palm_center_normalized(hand_landmarks):
+    """Centro de la palma en coordenadas normalizadas (0-1)"""
+    wrist = hand_landmarks.landmark[0]
+    middle_base = hand_landmarks.landmark[9]
+    return (wrist.x + middle_base.x) / 2, (wrist.y + middle_base.y) / 2
+
+def get_landmark_array(hand_landmarks):
+    """Convierte los 21 landmarks de una mano en un array (21, 3) normalizado"""
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark],
+                    dtype=np.float32)
+
+# ============================================
+# GEOMETRÍA DE PANTALLA
+# ============================================
+
+# Tablas en píxeles de los elementos fijos (separador, textos, marcadores).
+# Se compilan en apply_resolution cuando cambia el tamaño del frame.
+screen_layout = {}
+layout_size = None
+
+def compile_screen_layout(w, h):
+    """Precalcula posiciones y tamaños en píxeles de los elementos fijos"""
+    scale = h / LAYOUT_REFERENCE_HEIGHT
+    pad_min_y = int(round(PAD_MIN_Y * h))
+    
+    separator_text = "ZONA DE PADS (BATERIA) - Solo aqui abajo"
+    separator_font = 0.8 * scale
+    separator_thickness = ui_size(2, scale)
+    text_size = cv2.getTextSize(separator_text, cv2.FONT_HERSHEY_SIMPLEX,
+                                separator_font, separator_thickness)[0]
+    text_x = (w - text_size[0]) // 2
+    
+    return {
+        'scale': scale,
+        'pad_min_y': pad_min_y,
+        
+        # Línea separadora y su texto
+        'separator_start': (0, pad_min_y),
+        'separator_end': (w, pad_min_y),
+        'separator_thickness': ui_size(4, scale),
+        'separator_text': separator_text,
+        'separator_font': separator_font,
+        'separator_text_thickness': separator_thickness,
+        'separator_text_pos': (text_x, pad_min_y + ui_size(30, scale)),
+        'separator_bg': ((text_x - ui_size(10, scale), pad_min_y + ui_size(5, scale)),
+                         (text_x + text_size[0] + ui_size(10, scale), pad_min_y + ui_size(40, scale))),
+        
+        # Pinza y palma
+        'pinch_line': ui_size(4, scale),
+        'pinch_tip_radius': ui_size(15, scale),
+        'pinch_tip_border': ui_size(3, scale),
+        'palm_radii_pad_zone': (ui_size(50, scale), ui_size(42, scale), ui_size(4, scale)),
+        'palm_radii': (ui_size(40, scale), ui_size(35, scale), ui_size(3, scale)),
+        'palm_inner_radius': ui_size(25, scale),
+        'palm_center_radius': ui_size(10, scale),
+        'palm_cross': ui_size(20, scale),
+        'palm_stroke': ui_size(3, scale),
+        
+        # Información en pantalla
+        'title_pos': (ui_size(10, scale), ui_size(30, scale)),
+        'title_font': 1.0 * scale,
+        'status_pos': (ui_size(10, scale), ui_size(75, scale)),
+        'status_font': 0.7 * scale,
+        'mapping_pos': (ui_size(10, scale), ui_size(105, scale)),
+        'small_font': 0.6 * scale,
+        'tiny_font': 0.5 * scale,
+        'text_thick': ui_size(3, scale),
+        'text_thin': ui_size(2, scale),
+        'instructions': [
+            ("ARRIBA: Pinza para sliders (efectos) | ABAJO: Palma para pads (bateria)",
+             (ui_size(10, scale), h - ui_size(80, scale)), 0.6 * scale, (220, 220, 220), ui_size(2, scale)),
+            ("Las zonas estan SEPARADAS - No se cruzan!",
+             (ui_size(10, scale), h - ui_size(50, scale)), 0.6 * scale, (0, 255, 255), ui_size(2, scale)),
+            ("Presiona 'q' o ESC para salir",
+             (ui_size(10, scale), h - ui_size(20, scale)), 0.5 * scale, (150, 150, 150), 1),
+        ],
+    }
+
+def apply_resolution(w, h):
+    """Recompila toda la geometría para un frame de w x h píxeles"""
+    global screen_layout, layout_size, pad_engine
+    
+    for slider in sliders:
+        slider.set_geometry(w, h)
+    for pad in pads:
+        pad.set_geometry(w, h)
+    
+    screen_layout = compile_screen_layout(w, h)
+    pad_engine = build_pad_engine(pads, w / h)
+    layout_size = (w, h)
+
+apply_resolution(CAMERA_WIDTH, CAMERA_HEIGHT)
+
+# ============================================
+# FUNCIONES DE DIBUJO
+# ============================================
+
 def draw_pinch_visualization(frame, thumb_pos, index_pos, hand_color):
     """Dibuja la visualización de la pinza"""
     thumb_x, thumb_y = thumb_pos
     index_x, index_y = index_pos
+    radius = screen_layout['pinch_tip_radius']
+    border = screen_layout['pinch_tip_border']
     
     # Línea entre pulgar e índice
     cv2.line(frame, (thumb_x, thumb_y), (index_x, index_y),
-             PINCH_LINE_COLOR, 4)
+             PINCH_LINE_COLOR, screen_layout['pinch_line'])
     
     # Círculos en las puntas
-    cv2.circle(frame, (thumb_x, thumb_y), 15, hand_color, -1)
-    cv2.circle(frame, (thumb_x, thumb_y), 15, (255, 255, 255), 3)
+    cv2.circle(frame, (thumb_x, thumb_y), radius, hand_color, -1)
+    cv2.circle(frame, (thumb_x, thumb_y), radius, (255, 255, 255), border)
     
-    cv2.circle(frame, (index_x, index_y), 15, hand_color, -1)
-    cv2.circle(frame, (index_x, index_y), 15, (255, 255, 255), 3)
+    cv2.circle(frame, (index_x, index_y), radius, hand_color, -1)
+    cv2.circle(frame, (index_x, index_y), radius, (255, 255, 255), border)
 
 def draw_palm_marker(frame, x, y, color, in_pad_zone=False):
     """Dibuja un marcador grande en el centro de la palma"""
-    # Destacar más cuando está en zona de pads
+    # Destacar más cuando está en zona de pads (círculo grande y visible)
     if in_pad_zone:
-        # Círculo grande y visible
-        cv2.circle(frame, (x, y), 50, color, 4)
-        cv2.circle(frame, (x, y), 42, color, -1)
+        outer, filled, outer_thickness = screen_layout['palm_radii_pad_zone']
     else:
-        # Normal
-        cv2.circle(frame, (x, y), 40, color, 3)
-        cv2.circle(frame, (x, y), 35, color, -1)
+        outer, filled, outer_thickness = screen_layout['palm_radii']
+    cv2.circle(frame, (x, y), outer, color, outer_thickness)
+    cv2.circle(frame, (x, y), filled, color, -1)
+    
+    stroke = screen_layout['palm_stroke']
     
     # Círculo medio
-    cv2.circle(frame, (x, y), 25, (255, 255, 255), 3)
+    cv2.circle(frame, (x, y), screen_layout['palm_inner_radius'], (255, 255, 255), stroke)
     
     # Centro
-    cv2.circle(frame, (x, y), 10, (255, 255, 255), -1)
+    cv2.circle(frame, (x, y), screen_layout['palm_center_radius'], (255, 255, 255), -1)
     
     # Cruz para indicar centro exacto
-    line_len = 20
-    cv2.line(frame, (x - line_len, y), (x + line_len, y), (0, 0, 0), 3)
-    cv2.line(frame, (x, y - line_len), (x, y + line_len), (0, 0, 0), 3)
+    line_len = screen_layout['palm_cross']
+    cv2.line(frame, (x - line_len, y), (x + line_len, y), (0, 0, 0), stroke)
+    cv2.line(frame, (x, y - line_len), (x, y + line_len), (0, 0, 0), stroke)
 
 def draw_separator_line(frame):
     """Dibuja una línea clara separando las zonas"""
-    # Línea amarilla gruesa
-    cv2.line(frame, (0, PAD_MIN_Y), (CAMERA_WIDTH, PAD_MIN_Y),
-             (0, 255, 255), 4)
+    layout = screen_layout
     
-    # Texto "ZONA DE PADS"
-    zone_text = "ZONA DE PADS (BATERIA) - Solo aqui abajo"
-    text_size = cv2.getTextSize(zone_text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
-    text_x = (CAMERA_WIDTH - text_size[0]) // 2
+    # Línea amarilla gruesa
+    cv2.line(frame, layout['separator_start'], layout['separator_end'],
+             (0, 255, 255), layout['separator_thickness'])
     
     # Fondo negro para el texto
-    cv2.rectangle(frame,
-                 (text_x - 10, PAD_MIN_Y + 5),
-                 (text_x + text_size[0] + 10, PAD_MIN_Y + 40),
-                 (0, 0, 0), -1)
+    bg_top_left, bg_bottom_right = layout['separator_bg']
+    cv2.rectangle(frame, bg_top_left, bg_bottom_right, (0, 0, 0), -1)
     
-    cv2.putText(frame, zone_text,
-               (text_x, PAD_MIN_Y + 30),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+    # Texto "ZONA DE PADS"
+    cv2.putText(frame, layout['separator_text'], layout['separator_text_pos'],
+               cv2.FONT_HERSHEY_SIMPLEX, layout['separator_font'], (0, 255, 255),
+               layout['separator_text_thickness'])
 
 # ============================================
-# LOOP PRINCIPAL
+# PROCESAMIENTO POR FRAME
 # ============================================
 
-try:
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            continue
-        
-        # Voltear horizontalmente para efecto espejo
-        frame = cv2.flip(frame, 1)
-        h, w = frame.shape[:2]
-        
-        # Fondo más oscuro para colores vibrantes
-        frame = cv2.convertScaleAbs(frame, alpha=0.5, beta=0)
-        
-        # Procesar con MediaPipe
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        rgb.flags.writeable = False
-        results = hands.process(rgb)
-        
-        # Resetear estado de sliders
-        for slider in sliders:
-            slider.is_active = False
-        
-        hand_data = {}  # Almacenar datos de cada mano
-        
-        # Detectar manos
-        if results.multi_hand_landmarks and results.multi_handedness:
-            for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
-                hand_label = handedness.classification[0].label  # "Left" o "Right"
-                
-                # Obtener datos de pinza
-                distance, thumb_pos, index_pos, pinch_center = get_pinch_distance(hand_landmarks, w, h)
-                pinch_center_x, pinch_center_y = pinch_center
-                
-                # Obtener centro de la palma (para pads)
-                palm_x, palm_y = get_palm_center(hand_landmarks, w, h)
-                
-                hand_data[hand_label] = {
-                    'distance': distance,
-                    'thumb_pos': thumb_pos,
-                    'index_pos': index_pos,
-                    'pinch_center_x': pinch_center_x,
-                    'pinch_center_y': pinch_center_y,
-                    'palm_x': palm_x,
-                    'palm_y': palm_y
-                }
-        
-        # Actualizar sliders según mano correspondiente (solo en zona de activación)
-        for slider in sliders:
-            if slider.hand_type in hand_data:
-                data = hand_data[slider.hand_type]
-                slider.update_from_pinch(data['distance'], 
-                                        data['pinch_center_x'], 
-                                        data['pinch_center_y'])
-                if slider.is_active:
-                    slider.send_midi_if_changed(midi_out)
-        
-        # Verificar pads con PALMA de la mano (cualquier mano puede tocarlos)
-        for hand_label, data in hand_data.items():
-            for pad in pads:
-                pad.check_touch_with_palm(data['palm_x'], data['palm_y'])
-        
-        # Actualizar pads (para note off)
-        for pad in pads:
-            pad.update()
-        
-        # DIBUJAR TODO
-        # ============
-        
-        # 1. Línea separadora entre zonas
-        draw_separator_line(frame)
-        
-        # 2. Pads (fondo)
-        for pad in pads:
-            pad.draw(frame)
-        
-        # 3. Sliders
-        for slider in sliders:
-            slider.draw(frame)
-        
-        # 4. Visualización de pinzas y palmas
-        for hand_label, data in hand_data.items():
-            if hand_label == "Left":
-                hand_color = HAND_LEFT_COLOR
-            else:
-                hand_color = HAND_RIGHT_COLOR
+def collect_hand_data(results, w, h):
+    """Extrae de los resultados de MediaPipe los datos de cada mano"""
+    hand_data = {}  # Almacenar datos de cada mano
+    
+    # Detectar manos
+    if results.multi_hand_landmarks and results.multi_handedness:
+        for hand_id, (hand_landmarks, handedness) in enumerate(zip(results.multi_hand_landmarks, results.multi_handedness)):
+            hand_label = handedness.classification[0].label  # "Left" o "Right"
             
-            # Dibujar pinza (solo si está en zona de sliders)
-            in_slider_zone = False
-            for slider in sliders:
-                if slider.hand_type == hand_label and slider.is_in_zone:
-                    in_slider_zone = True
-                    break
+            # Obtener datos de pinza
+            distance, thumb_pos, index_pos, pinch_center = get_pinch_distance(hand_landmarks, w, h)
+            pinch_center_x, pinch_center_y = pinch_center
             
-            if in_slider_zone:
-                # Dibujar pinza cuando está en zona activa
-                draw_pinch_visualization(frame, data['thumb_pos'], data['index_pos'], hand_color)
+            # Obtener centro de la palma (para dibujar)
+            palm_x, palm_y = get_palm_center(hand_landmarks, w, h)
             
-            # Dibujar marcador de palma (destacar si está en zona de pads)
-            in_pad_zone = data['palm_y'] >= PAD_MIN_Y
-            draw_palm_marker(frame, data['palm_x'], data['palm_y'], hand_color, in_pad_zone)
-        
-        # INFORMACIÓN EN PANTALLA
-        # =======================
-        
-        info_y = 30
-        cv2.putText(frame, "CONTROLADOR MIDI MEJORADO",
-                   (10, info_y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 3)
-        
-        info_y += 45
-        left_active = sliders[0].is_active
-        right_active = sliders[1].is_active
-        
-        status_parts = []
-        if left_active:
-            status_parts.append("SLIDER IZQ")
-        if right_active:
-            status_parts.append("SLIDER DER")
-        
-        # Mostrar pads activos
-        active_pads = [p.label for p in pads if p.is_active]
-        if active_pads:
-            status_parts.extend(active_pads)
-        
-        if status_parts:
-            status_text = "Activo: " + " + ".join(status_parts)
-            status_color = (0, 255, 255)
+            # Valores normalizados (para hit-test de sliders y pads)
+            pinch_norm_distance, (pinch_nx, pinch_ny) = get_pinch_normalized(hand_landmarks, w / h)
+            palm_nx, palm_ny = get_palm_center_normalized(hand_landmarks)
+            
+            hand_data[hand_label] = {
+                'hand_id': hand_id,
+                'landmarks': get_landmark_array(hand_landmarks),
+                'distance': distance,
+                'thumb_pos': thumb_pos,
+                'index_pos': index_pos,
+                'pinch_center_x': pinch_center_x,
+                'pinch_center_y': pinch_center_y,
+                'palm_x': palm_x,
+                'palm_y': palm_y,
+                'pinch_norm_distance': pinch_norm_distance,
+                'pinch_nx': pinch_nx,
+                'pinch_ny': pinch_ny,
+                'palm_nx': palm_nx,
+                'palm_ny': palm_ny
+            }
+    
+    return hand_data
+
+def update_controls(hand_data, frame_time, w, h):
+    """Actualiza sliders, pads y mapeos con los datos de las manos y envía MIDI"""
+    # Resetear estado de sliders
+    for slider in sliders:
+        slider.is_active = False
+    
+    # Actualizar sliders según mano correspondiente (solo en zona de activación)
+    for slider in sliders:
+        if slider.hand_type in hand_data:
+            data = hand_data[slider.hand_type]
+            slider.update_from_pinch(data['pinch_norm_distance'], 
+                                    data['pinch_nx'], 
+                                    data['pinch_ny'])
+            if slider.is_active:
+                slider.send_midi_if_changed(midi_out)
+    
+    # Verificar pads con PALMA de la mano (cualquier mano puede tocarlos)
+    # El motor interpola el instante de cruce y la velocity del golpe
+    # (espacio normalizado isotrópico: x escalada por el aspecto)
+    aspect = w / h
+    pad_hits = pad_engine.update(frame_time, {
+        hand_label: (data['palm_nx'] * aspect, data['palm_ny'])
+        for hand_label, data in hand_data.items()
+    })
+    for hit in pad_hits:
+        pads[hit.pad].trigger(hit.velocity, hit.time)
+    
+    # Actualizar pads (para note off)
+    for pad in pads:
+        pad.update()
+    
+    # Evaluar todos los mapeos declarativos en lote
+    if mapping_engine is not None:
+        mapping_handedness[:] = -1
+        for slot, (hand_label, data) in enumerate(list(hand_data.items())[:2]):
+            mapping_landmarks[slot] = data['landmarks']
+            mapping_handedness[slot] = 0 if hand_label == "Left" else 1
+        send_mapping_messages(*mapping_engine.evaluate(mapping_landmarks,
+                                                       mapping_handedness,
+                                                       w / h))
+
+def publish_frame(publisher, frame_index, frame_time, hand_data):
+    """Publica el estado del frame en memoria compartida (para otros procesos)"""
+    shared_hands = [
+        (data['hand_id'], hand_label, data['landmarks'],
+         data['distance'],
+         (data['pinch_center_x'], data['pinch_center_y']),
+         (data['palm_x'], data['palm_y']))
+        for hand_label, data in hand_data.items()
+    ]
+    publisher.publish(frame_index, frame_time, shared_hands,
+                      [slider.value for slider in sliders],
+                      [slider.is_active for slider in sliders],
+                      [pad.is_active for pad in pads])
+
+def record_frame(recorder, frame_index, frame_time, hand_data, stage_ms):
+    """Graba el frame en la sesión (solo copia a buffers en memoria, sin I/O)"""
+    recorder.record_frame(
+        frame_index, frame_time,
+        [(hand_label, data['landmarks']) for hand_label, data in hand_data.items()],
+        [slider.value for slider in sliders],
+        [pad.trigger_count for pad in pads],
+        stage_ms)
+
+def draw_interface(frame, hand_data):
+    """Dibuja zonas, pads, sliders, manos e información en el frame"""
+    # 1. Línea separadora entre zonas
+    draw_separator_line(frame)
+    
+    # 2. Pads (fondo)
+    for pad in pads:
+        pad.draw(frame)
+    
+    # 3. Sliders
+    for slider in sliders:
+        slider.draw(frame)
+    
+    # 4. Visualización de pinzas y palmas
+    for hand_label, data in hand_data.items():
+        if hand_label == "Left":
+            hand_color = HAND_LEFT_COLOR
         else:
-            status_text = "Esperando manos..."
-            status_color = (150, 150, 150)
-        
-        cv2.putText(frame, status_text,
-                   (10, info_y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, status_color, 2)
-        
-        # Instrucciones (abajo)
-        instruction_y = h - 80
-        cv2.putText(frame, "ARRIBA: Pinza para sliders (efectos) | ABAJO: Palma para pads (bateria)",
-                   (10, instruction_y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (220, 220, 220), 2)
+            hand_color = HAND_RIGHT_COLOR
         
-        instruction_y += 30
-        cv2.putText(frame, "Las zonas estan SEPARADAS - No se cruzan!",
-                   (10, instruction_y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-        
-        instruction_y += 30
-        cv2.putText(frame, "Presiona 'q' o ESC para salir",
-                   (10, instruction_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
+        # Dibujar pinza (solo si está en zona de sliders)
+        in_slider_zone = False
+        for slider in sliders:
+            if slider.hand_type == hand_label and slider.is_in_zone:
+                in_slider_zone = True
+                break
         
-        # Mostrar frame
-        cv2.imshow('MIDI Controller - Mejorado', frame)
+        if in_slider_zone:
+            # Dibujar pinza cuando está en zona activa
+            draw_pinch_visualization(frame, data['thumb_pos'], data['index_pos'], hand_color)
         
-        # Control de teclado
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q') or key == 27:
-            break
-
-except KeyboardInterrupt:
-    print("\n⚠️  Interrupción detectada (Ctrl+C)")
+        # Dibujar marcador de palma (destacar si está en zona de pads)
+        in_pad_zone = data['palm_ny'] >= PAD_MIN_Y
+        draw_palm_marker(frame, data['palm_x'], data['palm_y'], hand_color, in_pad_zone)
+    
+    # INFORMACIÓN EN PANTALLA
+    # =======================
+    layout = screen_layout
+    
+    cv2.putText(frame, "CONTROLADOR MIDI MEJORADO",
+               layout['title_pos'], cv2.FONT_HERSHEY_SIMPLEX, layout['title_font'],
+               (255, 255, 255), layout['text_thick'])
+    
+    left_active = sliders[0].is_active
+    right_active = sliders[1].is_active
+    
+    status_parts = []
+    if left_active:
+        status_parts.append("SLIDER IZQ")
+    if right_active:
+        status_parts.append("SLIDER DER")
+    
+    # Mostrar pads activos
+    active_pads = [p.label for p in pads if p.is_active]
+    if active_pads:
+        status_parts.extend(active_pads)
+    
+    if status_parts:
+        status_text = "Activo: " + " + ".join(status_parts)
+        status_color = (0, 255, 255)
+    else:
+        status_text = "Esperando manos..."
+        status_color = (150, 150, 150)
+    
+    cv2.putText(frame, status_text,
+               layout['status_pos'], cv2.FONT_HERSHEY_SIMPLEX, layout['status_font'],
+               status_color, layout['text_thin'])
+    
+    # Set de mapeos activo
+    if mapping_engine is not None:
+        mapping_set = mapping_engine.current
+        active_mappings = int(mapping_set.active.sum())
+        cv2.putText(frame, f"Mapeos: {mapping_set.name} ({active_mappings}/{len(mapping_set)} activos)",
+                   layout['mapping_pos'], cv2.FONT_HERSHEY_SIMPLEX, layout['small_font'],
+                   (200, 200, 200), layout['text_thin'])
+    
+    # Instrucciones (abajo)
+    for text, position, font_scale, color, thickness in layout['instructions']:
+        cv2.putText(frame, text, position,
+                   cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
 
 # ============================================
-# LIMPIEZA
+# PROGRAMA PRINCIPAL
 # ============================================
 
-print("\n🧹 Limpiando...")
-
-# Resetear todos los CC a 0
-for slider in sliders:
-    msg = mido.Message('control_change',
-                      channel=MIDI_CHANNEL,
-                      control=slider.cc_number,
-                      value=0)
-    midi_out.send(msg)
-
-# Apagar todas las notas de los pads
-for pad in pads:
-    msg = mido.Message('note_off',
-                      channel=MIDI_CHANNEL,
-                      note=pad.note,
-                      velocity=0)
-    midi_out.send(msg)
-
-# Liberar recursos
-cap.release()
-cv2.destroyAllWindows()
-hands.close()
-midi_out.close()
-
-print("✅ Finalizado correctamente")
-print("¡Hasta pronto! 🎛️")
+def main(camera_source=CAMERA_SOURCE):
+    global midi_out, note_scheduler, mapping_engine, pad_onset_latency
+
+    # ============================================
+    # INICIALIZACIÓN MIDI
+    # ============================================
+
+    print("🎛️  CONTROLADOR MIDI MEJORADO - 2 PINZAS + 4 PADS")
+    print("=" * 65)
+
+    # Buscar puerto MIDI (IAC Driver en Mac)
+    ports = mido.get_output_names()
+    print("\n📡 Puertos MIDI disponibles:")
+    for i, p in enumerate(ports):
+        print(f"  {i+1}. {p}")
+
+    port_name = None
+    for p in ports:
+        if "IAC" in p or "Bus" in p:
+            port_name = p
+            break
+
+    if not port_name and ports:
+        port_name = ports[0]
+
+    if not port_name:
+        print("\n❌ No se encontró ningún puerto MIDI")
+        print("💡 Habilita IAC Driver en 'Configuración MIDI de Audio'")
+        return
+
+    try:
+        midi_out = mido.open_output(port_name)
+        print(f"\n✅ MIDI conectado: {port_name}")
+        print(f"\n🤏 SLIDERS (Control con Pinza - ZONA SUPERIOR):")
+        print(f"   Mano IZQUIERDA (Magenta) → CC#{SLIDER_LEFT_CC}")
+        print(f"   Mano DERECHA (Cyan) → CC#{SLIDER_RIGHT_CC}")
+        print(f"   ⚠️  Solo funcionan en la ZONA SUPERIOR (barras iluminadas)")
+        print(f"\n🥁 PADS (Notas MIDI - ZONA INFERIOR):")
+        print(f"   Pad 1 (Rojo) → Nota {PAD_1_NOTE} (C1)")
+        print(f"   Pad 2 (Azul) → Nota {PAD_2_NOTE} (D1)")
+        print(f"   Pad 3 (Amarillo) → Nota {PAD_3_NOTE} (F#1)")
+        print(f"   Pad 4 (Verde) → Nota {PAD_4_NOTE} (A#1)")
+        print(f"   ⚠️  Solo funcionan en la ZONA INFERIOR (círculos abajo)")
+    except Exception as e:
+        print(f"\n❌ Error al abrir puerto MIDI: {e}")
+        return
+
+    # ============================================
+    # INICIALIZACIÓN MEDIAPIPE
+    # ============================================
+
+    mp_hands = mp.solutions.hands
+    hands = mp_hands.Hands(
+        static_image_mode=False,
+        max_num_hands=2,  # Dos manos para controlar dos sliders
+        min_detection_confidence=0.7,
+        min_tracking_confidence=0.8,
+        model_complexity=1
+    )
+
+    # ============================================
+    # INICIALIZACIÓN CÁMARA
+    # ============================================
+
+    cap = open_source(camera_source, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS,
+                      CAMERA_FOURCCS)
+
+    if not cap.isOpened():
+        print(f"\n❌ No se pudo abrir la cámara: {camera_source}")
+        return
+
+    print("✅ Cámara iniciada")
+    # Verificar lo que el driver negoció y la tasa que realmente entrega
+    measure_fps(cap, CAMERA_FPS_CHECK_SECONDS)
+    report(cap, CAMERA_FPS)
+
+    # La latencia de los pads tiene que cubrir exposición → inferencia
+    if PAD_ONSET_LATENCY_AUTO:
+        pad_onset_latency, measured = calibrate_onset_latency(cap, hands)
+        if measured is not None:
+            print(f"   Exposición → inferencia (p95): {measured * 1000:.0f} ms")
+    print(f"   Latencia de onset de pads: {pad_onset_latency * 1000:.0f} ms")
+    print("\n📝 Instrucciones:")
+    print("   • SLIDERS: Haz gesto de PINZA en la ZONA SUPERIOR")
+    print("     - La zona está claramente marcada con rectángulos")
+    print("     - Cerrada = 0 | Abierta = 127")
+    print("   • PADS: Coloca la PALMA en la ZONA INFERIOR")
+    print("     - Solo funcionan DEBAJO de la línea amarilla")
+    print("     - Zonas totalmente SEPARADAS para evitar confusión")
+    print("   • Presiona 'm' para cambiar de set de mapeos, 'r' para recargarlos")
+    print("   • Presiona 'q' o 'ESC' para salir")
+    print("=" * 65)
+
+    # ============================================
+    # MEMORIA COMPARTIDA
+    # ============================================
+
+    landmark_publisher = None
+    if SHARED_MEMORY_ENABLED:
+        try:
+            landmark_publisher = LandmarkPublisher(SHARED_MEMORY_NAME,
+                                                   max_hands=2,
+                                                   max_sliders=len(sliders),
+                                                   max_pads=len(pads))
+            print(f"✅ Landmarks publicados en memoria compartida: '{SHARED_MEMORY_NAME}'")
+        except Exception as e:
+            print(f"⚠️  No se pudo crear la memoria compartida: {e}")
+
+    # ============================================
+    # GRABADOR DE SESIÓN
+    # ============================================
+
+    session_recorder = None
+    if RECORDING_ENABLED:
+        try:
+            session_dir = os.path.join(RECORDING_DIR, time.strftime("%Y%m%d-%H%M%S"))
+            session_recorder = SessionRecorder(
+                session_dir,
+                max_hands=2,
+                n_sliders=len(sliders),
+                n_pads=len(pads),
+                stage_names=STAGE_NAMES,
+                metadata={
+                    'slider_cc': [slider.cc_number for slider in sliders],
+                    'pad_notes': [pad.note for pad in pads],
+                    'midi_port': port_name,
+                    'camera': cap.mode,
+                    'camera_measured_fps': cap.measured_fps,
+                    'pad_onset_latency': pad_onset_latency,
+                })
+            # Todo mensaje MIDI enviado queda grabado
+            midi_out = RecordingMidiOutput(midi_out, session_recorder)
+            print(f"✅ Grabando sesión en: {session_dir}")
+        except Exception as e:
+            print(f"⚠️  No se pudo iniciar el grabador de sesión: {e}")
+            session_recorder = None
+
+    # ============================================
+    # AGENDA DE NOTAS
+    # ============================================
+
+    # Se crea después del grabador para que las notas agendadas queden grabadas
+    note_scheduler = NoteScheduler(midi_out)
+
+    # ============================================
+    # MOTOR DE MAPEOS
+    # ============================================
+
+    mapping_engine = None
+    if MAPPINGS_ENABLED and os.path.exists(MAPPINGS_FILE):
+        try:
+            mapping_engine = MappingEngine(MAPPINGS_FILE, default_channel=MIDI_CHANNEL)
+            print(f"✅ Mapeos cargados de {MAPPINGS_FILE}: {', '.join(mapping_engine.order)}")
+            print(f"   Set activo: {mapping_engine.current.name} ({len(mapping_engine.current)} mapeos)")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  No se pudieron cargar los mapeos: {e}")
+
+    # ============================================
+    # LOOP PRINCIPAL
+    # ============================================
+
+    frame_index = 0
+
+    try:
+        while True:
+            t_capture = time.perf_counter()
+            captured = cap.read()
+            if captured is None:
+                continue
+            
+            # Instante de exposición (timestamp del driver), no el de read()
+            frame = captured.image
+            frame_time = captured.timestamp
+            frame_index += 1
+            if session_recorder is not None:
+                session_recorder.begin_frame(frame_index)
+            t_inference = time.perf_counter()
+            
+            # Voltear horizontalmente para efecto espejo
+            frame = cv2.flip(frame, 1)
+            h, w = frame.shape[:2]
+            
+            # Fondo más oscuro para colores vibrantes
+            frame = cv2.convertScaleAbs(frame, alpha=0.5, beta=0)
+            
+            # Procesar con MediaPipe
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            rgb.flags.writeable = False
+            results = hands.process(rgb)
+            t_logic = time.perf_counter()
+            
+            # La geometría se recompila solo si cambia la resolución
+            if (w, h) != layout_size:
+                apply_resolution(w, h)
+            
+            hand_data = collect_hand_data(results, w, h)
+            update_controls(hand_data, frame_time, w, h)
+            
+            # Publicar estado en memoria compartida (para otros procesos)
+            if landmark_publisher is not None:
+                publish_frame(landmark_publisher, frame_index, frame_time, hand_data)
+            
+            t_render = time.perf_counter()
+            
+            # DIBUJAR TODO
+            # ============
+            draw_interface(frame, hand_data)
+            
+            # Mostrar frame
+            t_display = time.perf_counter()
+            cv2.imshow('MIDI Controller - Mejorado', frame)
+            
+            # Control de teclado
+            key = cv2.waitKey(1) & 0xFF
+            
+            # Grabar frame (solo copia a buffers en memoria, sin I/O)
+            if session_recorder is not None:
+                t_end = time.perf_counter()
+                record_frame(
+                    session_recorder, frame_index, frame_time, hand_data,
+                    [(t_inference - t_capture) * 1000,
+                     (t_logic - t_inference) * 1000,
+                     (t_render - t_logic) * 1000,
+                     (t_display - t_render) * 1000,
+                     (t_end - t_display) * 1000,
+                     (captured.read_time - frame_time) * 1000])
+            
+            if key == ord('q') or key == 27:
+                break
+            
+            # Cambiar de set de mapeos / recargar el archivo
+            if mapping_engine is not None:
+                if key == ord('m'):
+                    send_mapping_messages([], [], mapping_engine.next_set())
+                    print(f"🎚️  Set de mapeos: {mapping_engine.current.name}")
+                elif key == ord('r') or (frame_index % MAPPINGS_RELOAD_INTERVAL == 0
+                                         and mapping_engine.has_changed()):
+                    reload_mappings()
+
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupción detectada (Ctrl+C)")
+
+    # ============================================
+    # LIMPIEZA
+    # ============================================
+
+    finally:
+        # También si el loop falla: la sesión grabada es la que explica qué pasó
+        print("\n🧹 Limpiando...")
+
+        try:
+            # Enviar las notas que queden agendadas antes de resetear
+            note_scheduler.close()
+            if note_scheduler.late:
+                print(f"⚠️  {note_scheduler.late} mensajes agendados ya vencidos "
+                      f"(latencia de onset {pad_onset_latency * 1000:.0f} ms insuficiente)")
+
+            # Apagar las notas que dejó sonando el motor de mapeos
+            if mapping_engine is not None:
+                send_mapping_messages([], [], mapping_engine.current.held_notes())
+
+            # Resetear todos los CC a 0
+            for slider in sliders:
+                msg = mido.Message('control_change',
+                                  channel=MIDI_CHANNEL,
+                                  control=slider.cc_number,
+                                  value=0)
+                midi_out.send(msg)
+
+            # Apagar todas las notas de los pads
+            for pad in pads:
+                msg = mido.Message('note_off',
+                                  channel=MIDI_CHANNEL,
+                                  note=pad.note,
+                                  velocity=0)
+                midi_out.send(msg)
+
+            # Timestamps del driver que hubo que interpolar durante la sesión
+            clock = getattr(cap, 'clock', None)
+            if clock is not None and clock.anomalies:
+                print(f"⚠️  {clock.anomalies} timestamps del driver ausentes o repetidos")
+
+            # Liberar recursos
+            cap.release()
+            cv2.destroyAllWindows()
+            hands.close()
+            midi_out.close()
+
+            if landmark_publisher is not None:
+                landmark_publisher.close()
+        finally:
+            if session_recorder is not None:
+                print("💾 Guardando sesión...")
+                session_recorder.close()
+
+    print("✅ Finalizado correctamente")
+    print("¡Hasta pronto! 🎛️")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else CAMERA_SOURCE)
@@ -0,0 +1,299 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+# ============================================
+# GRABADOR DE SESIÓN
+# ============================================
+#
+# Graba cada frame del loop principal (landmarks, sliders, pads, tiempos
+# de cada etapa) y cada mensaje MIDI enviado en buffers NumPy
+# preasignados. Los buffers forman un anillo de chunks: cuando un chunk se
+# llena, un hilo en segundo plano lo guarda en disco como columnas .npy y
+# el loop sigue escribiendo en el siguiente. El loop nunca hace I/O.
+#
+# Estructura en disco:
+#   <sesion>/meta.json
+#   <sesion>/frames/000000/<columna>.npy
+#   <sesion>/events/000000/<columna>.npy
+
+NUM_LANDMARKS = 21
+
+HANDEDNESS_NONE = -1
+HANDEDNESS_LEFT = 0
+HANDEDNESS_RIGHT = 1
+
+
+def _frame_columns(max_hands, n_sliders, n_pads, n_stages):
+    """Columnas (nombre, dtype, forma por fila) de la tabla de frames"""
+    return [
+        ('frame_index', np.uint64, ()),
+        ('timestamp', np.float64, ()),                 # time.monotonic()
+        ('n_hands', np.uint8, ()),
+        ('handedness', np.int8, (max_hands,)),
+        ('landmarks', np.float32, (max_hands, NUM_LANDMARKS, 3)),
+        ('slider_values', np.uint8, (n_sliders,)),
+        ('pad_trigger_count', np.uint32, (n_pads,)),   # Acumulado por pad
+        ('stage_ms', np.float32, (n_stages,)),
+    ]
+
+
+EVENT_COLUMNS = [
+    ('frame_index', np.uint64, ()),
+    ('timestamp', np.float64, ()),
+    ('midi', np.uint8, (3,)),  # status, data1, data2
+]
+
+
+class _ChunkRing:
+    """Anillo de chunks preasignados para una tabla columnar"""
+
+    def __init__(self, columns, chunk_rows, n_chunks):
+        self.names = [name for name, _, _ in columns]
+        self.chunk_rows = chunk_rows
+        self.chunks = [
+            {name: np.zeros((chunk_rows,) + shape, dtype=dtype)
+             for name, dtype, shape in columns}
+            for _ in range(n_chunks)
+        ]
+        self.free = [True] * n_chunks
+        self.current = 0
+        self.row = 0
+        self.sequence = 0   # Número de chunk global (nombre del directorio)
+        self.dropped = 0
+
+    def acquire_row(self):
+        """Devuelve (chunk, fila) donde escribir, o None si no hay chunk libre"""
+        if not self.free[self.current]:
+            self.dropped += 1
+            return None
+        row = self.row
+        self.row += 1
+        return self.chunks[self.current], row
+
+    def is_full(self):
+        return self.row >= self.chunk_rows
+
+    def hand_off(self):
+        """Marca el chunk actual como pendiente y avanza al siguiente"""
+        job = (self.current, self.sequence, self.row)
+        self.free[self.current] = False
+        self.current = (self.current + 1) % len(self.chunks)
+        self.sequence += 1
+        self.row = 0
+        return job
+
+
+class SessionRecorder:
+    def __init__(self, directory, max_hands=2, n_sliders=2, n_pads=4,
+                 stage_names=(), chunk_frames=600, n_chunks=4, metadata=None):
+        self.directory = directory
+        self.max_hands = max_hands
+        self.n_sliders = n_sliders
+        self.n_pads = n_pads
+        self.stage_names = list(stage_names)
+
+        self._frames = _ChunkRing(
+            _frame_columns(max_hands, n_sliders, n_pads, len(self.stage_names)),
+            chunk_frames, n_chunks)
+        self._events = _ChunkRing(EVENT_COLUMNS, chunk_frames, n_chunks)
+        # Los mensajes MIDI pueden llegar desde la agenda de notas (otro hilo)
+        self._events_lock = threading.Lock()
+
+        self._frame_index = 0
+        self._start_time = time.time()
+        self._metadata = dict(metadata or {})
+
+        os.makedirs(os.path.join(directory, 'frames'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'events'), exist_ok=True)
+        # meta.json desde el inicio: una sesión cortada por un crash se puede cargar
+        self._write_meta(closed=False)
+
+        # Hilo de escritura a disco
+        self._jobs = queue.Queue()
+        self._writer = threading.Thread(target=self._flush_loop,
+                                        name="grabador-sesion", daemon=True)
+        self._writer.start()
+
+    # ----- Loop principal (sin I/O) -----
+
+    def begin_frame(self, frame_index):
+        """Marca el frame en curso: los mensajes MIDI siguientes quedan asociados a él"""
+        self._frame_index = frame_index
+
+    def record_frame(self, frame_index, timestamp, hands, slider_values,
+                     pad_trigger_counts, stage_ms):
+        """Graba un frame. hands es una lista de (label, landmarks[21,3])"""
+        slot = self._frames.acquire_row()
+        if slot is None:
+            return
+        chunk, row = slot
+
+        n_hands = min(len(hands), self.max_hands)
+        chunk['frame_index'][row] = frame_index
+        chunk['timestamp'][row] = timestamp
+        chunk['n_hands'][row] = n_hands
+
+        handedness = chunk['handedness'][row]
+        landmarks = chunk['landmarks'][row]
+        handedness[:] = HANDEDNESS_NONE
+        for i in range(n_hands):
+            label, lms = hands[i]
+            handedness[i] = HANDEDNESS_LEFT if label == "Left" else HANDEDNESS_RIGHT
+            landmarks[i] = lms
+
+        chunk['slider_values'][row] = slider_values
+        chunk['pad_trigger_count'][row] = pad_trigger_counts
+        chunk['stage_ms'][row] = stage_ms
+
+        if self._frames.is_full():
+            self._jobs.put(('frames', self._frames.hand_off()))
+
+    def record_midi(self, msg, timestamp=None):
+        """Graba un mensaje MIDI enviado (mido.Message de 3 bytes o menos)"""
+        data = msg.bytes()
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        with self._events_lock:
+            slot = self._events.acquire_row()
+            if slot is None:
+                return
+            chunk, row = slot
+
+            midi = chunk['midi'][row]
+            midi[:] = 0
+            midi[:len(data)] = data[:3]
+            chunk['frame_index'][row] = self._frame_index
+            chunk['timestamp'][row] = timestamp
+
+            if self._events.is_full():
+                self._jobs.put(('events', self._events.hand_off()))
+
+    # ----- Hilo de escritura -----
+
+    def _flush_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            table, (index, sequence, rows) = job
+            ring = self._frames if table == 'frames' else self._events
+            chunk_dir = os.path.join(self.directory, table, f"{sequence:06d}")
+            try:
+                os.makedirs(chunk_dir, exist_ok=True)
+                for name in ring.names:
+                    np.save(os.path.join(chunk_dir, f"{name}.npy"),
+                            ring.chunks[index][name][:rows])
+            except OSError as e:
+                print(f"⚠️  Error al guardar la sesión: {e}")
+            finally:
+                ring.free[index] = True
+
+    # ----- Cierre -----
+
+    def close(self):
+        """Guarda los chunks parciales, espera al hilo y escribe meta.json"""
+        for table, ring in (('frames', self._frames), ('events', self._events)):
+            if ring.row > 0 and ring.free[ring.current]:
+                self._jobs.put((table, ring.hand_off()))
+        self._jobs.put(None)
+        self._writer.join()
+        self._write_meta(closed=True)
+
+    def _write_meta(self, closed):
+        meta = {
+            'start_time': self._start_time,
+            'max_hands': self.max_hands,
+            'n_sliders': self.n_sliders,
+            'n_pads': self.n_pads,
+            'stage_names': self.stage_names,
+            'dropped_frames': self._frames.dropped,
+            'dropped_events': self._events.dropped,
+            'closed': closed,   # False: la sesión terminó sin close() (crash)
+        }
+        meta.update(self._metadata)
+        with open(os.path.join(self.directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+
+class RecordingMidiOutput:
+    """Envuelve el puerto MIDI de salida y graba cada mensaje enviado"""
+
+    def __init__(self, midi_out, recorder):
+        self.midi_out = midi_out
+        self.recorder = recorder
+
+    def send(self, msg):
+        self.midi_out.send(msg)
+        self.recorder.record_midi(msg)
+
+    def close(self):
+        self.midi_out.close()
+
+
+# ============================================
+# CARGA PARA ANÁLISIS POST-SHOW
+# ============================================
+
+def _load_table(table_dir):
+    """Concatena los chunks de una tabla en un dict columna -> array"""
+    if not os.path.isdir(table_dir):
+        return {}
+    chunk_dirs = sorted(d for d in os.listdir(table_dir)
+                        if os.path.isdir(os.path.join(table_dir, d)))
+    columns = {}
+    for d in chunk_dirs:
+        for filename in sorted(os.listdir(os.path.join(table_dir, d))):
+            if filename.endswith('.npy'):
+                name = filename[:-4]
+                columns.setdefault(name, []).append(
+                    np.load(os.path.join(table_dir, d, filename)))
+    return {name: np.concatenate(parts) for name, parts in columns.items()}
+
+
+def load_session(directory):
+    """Carga una sesión grabada.
+
+    Devuelve (meta, frames, events), donde frames y events son dicts de
+    columnas NumPy. frames incluye además 'pad_triggers' (True en los frames
+    donde cada pad se disparó) derivado de 'pad_trigger_count'.
+    """
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+
+    frames = _load_table(os.path.join(directory, 'frames'))
+    events = _load_table(os.path.join(directory, 'events'))
+
+    if 'pad_trigger_count' in frames and len(frames['pad_trigger_count']):
+        counts = frames['pad_trigger_count'].astype(np.int64)
+        frames['pad_triggers'] = np.diff(counts, axis=0, prepend=np.zeros_like(counts[:1])) > 0
+
+    return meta, frames, events
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        print("Uso: python grabador_sesion.py <directorio_de_sesion>")
+        sys.exit(1)
+
+    meta, frames, events = load_session(sys.argv[1])
+    n = len(frames.get('frame_index', []))
+    print(f"🎬 Sesión: {sys.argv[1]}")
+    print(f"   Frames: {n} (perdidos: {meta['dropped_frames']})")
+    print(f"   Mensajes MIDI: {len(events.get('frame_index', []))}")
+    if n > 1:
+        duration = frames['timestamp'][-1] - frames['timestamp'][0]
+        print(f"   Duración: {duration:.1f} s ({(n - 1) / duration:.1f} fps)")
+        for i, stage in enumerate(meta['stage_names']):
+            stage_ms = frames['stage_ms'][:, i]
+            print(f"   {stage:<12} media {stage_ms.mean():6.2f} ms | "
+                  f"p99 {np.percentile(stage_ms, 99):6.2f} ms")
+        if 'pad_triggers' in frames:
+            print(f"   Golpes por pad: {frames['pad_triggers'].sum(axis=0).tolist()}")
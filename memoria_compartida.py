@@ -0,0 +1,323 @@
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# ============================================
+# MEMORIA COMPARTIDA DE LANDMARKS
+# ============================================
+#
+# El controlador publica en cada frame los landmarks de las manos y los
+# valores derivados (pinza, palma, sliders, pads) en un bloque de
+# multiprocessing.shared_memory con layout fijo. Otros procesos locales
+# (visuales, grabadores...) leen el estado sin volver a correr MediaPipe.
+#
+# Sincronización con seqlock:
+#   - El escritor pone el contador de secuencia en IMPAR, escribe el frame
+#     y lo pone en PAR.
+#   - El lector copia el frame solo si el contador era PAR y no cambió
+#     durante la copia. Si cambió, reintenta.
+# El escritor nunca espera a los lectores.
+#
+# Cada ejecución del controlador escribe un run_id distinto en la cabecera
+# y al cerrar pone magic = 0 antes de eliminar el bloque. Un lector que
+# sigue enganchado a un bloque viejo lo detecta con is_stale() y se vuelve
+# a enganchar al nuevo con reopen().
+
+SHM_NAME = "relincha_landmarks"
+SHM_MAGIC = 0x524C4E4B  # "RLNK"
+SHM_VERSION = 2
+
+NUM_LANDMARKS = 21  # Landmarks por mano en MediaPipe Hands
+
+# Lateralidad de cada mano en el bloque
+HANDEDNESS_NONE = -1
+HANDEDNESS_LEFT = 0
+HANDEDNESS_RIGHT = 1
+
+HEADER_DTYPE = np.dtype([
+    ('magic', '<u4'),
+    ('version', '<u4'),
+    ('seq', '<u8'),          # Contador del seqlock (impar = escribiendo)
+    ('max_hands', '<u4'),
+    ('max_sliders', '<u4'),
+    ('max_pads', '<u4'),
+    ('run_id', '<u4'),       # Distinto en cada ejecución del controlador
+])
+
+
+def frame_dtype(max_hands, max_sliders, max_pads):
+    """Dtype del registro de un frame (tamaño fijo según las capacidades)"""
+    return np.dtype([
+        ('frame_index', '<u8'),
+        ('timestamp', '<f8'),                              # time.monotonic() del frame
+        ('n_hands', '<u4'),
+        ('n_sliders', '<u4'),
+        ('n_pads', '<u4'),
+        ('reserved', '<u4'),
+        ('hand_id', '<i4', (max_hands,)),
+        ('handedness', 'i1', (max_hands,)),                # HANDEDNESS_*
+        ('landmarks', '<f4', (max_hands, NUM_LANDMARKS, 3)),  # x, y, z normalizados
+        ('pinch_distance', '<f4', (max_hands,)),           # Píxeles
+        ('pinch_center', '<f4', (max_hands, 2)),           # Píxeles
+        ('palm_center', '<f4', (max_hands, 2)),            # Píxeles
+        ('slider_values', 'u1', (max_sliders,)),           # 0-127
+        ('slider_active', 'u1', (max_sliders,)),
+        ('pad_states', 'u1', (max_pads,)),                 # 1 = pad sonando
+    ])
+
+
+def handedness_code(label):
+    """Convierte la etiqueta de MediaPipe ("Left"/"Right") al código del bloque"""
+    if label == "Left":
+        return HANDEDNESS_LEFT
+    if label == "Right":
+        return HANDEDNESS_RIGHT
+    return HANDEDNESS_NONE
+
+
+def _invalidate(buf):
+    """Marca el bloque como inválido (magic = 0) para los lectores enganchados"""
+    np.ndarray((), dtype=HEADER_DTYPE, buffer=buf)['magic'] = 0
+
+
+def _map_block(buf):
+    """Crea las vistas NumPy (cabecera y frame) sobre el buffer compartido"""
+    header = np.ndarray((), dtype=HEADER_DTYPE, buffer=buf)
+    dtype = frame_dtype(int(header['max_hands']),
+                        int(header['max_sliders']),
+                        int(header['max_pads']))
+    frame = np.ndarray((), dtype=dtype, buffer=buf, offset=HEADER_DTYPE.itemsize)
+    return header, frame
+
+
+# ============================================
+# ESCRITOR (CONTROLADOR)
+# ============================================
+
+class LandmarkPublisher:
+    def __init__(self, name=SHM_NAME, max_hands=2, max_sliders=2, max_pads=4):
+        self.name = name
+        self.max_hands = max_hands
+        self.max_sliders = max_sliders
+        self.max_pads = max_pads
+
+        size = HEADER_DTYPE.itemsize + frame_dtype(max_hands, max_sliders, max_pads).itemsize
+
+        # Si quedó un bloque de una ejecución anterior, reutilizarlo solo si cabe
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self.shm = shared_memory.SharedMemory(name=name)
+            if self.shm.size < size:
+                _invalidate(self.shm.buf)
+                self.shm.close()
+                self.shm.unlink()
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        # La cabecera se escribe con magic = 0 hasta que esté completa
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self.shm.buf)
+        header['magic'] = 0
+        header['version'] = SHM_VERSION
+        header['seq'] = 0
+        header['max_hands'] = max_hands
+        header['max_sliders'] = max_sliders
+        header['max_pads'] = max_pads
+        header['run_id'] = int.from_bytes(os.urandom(4), 'little') or 1
+        self.run_id = int(header['run_id'])
+
+        self._header, self._frame = _map_block(self.shm.buf)
+        self._frame[...] = np.zeros((), dtype=self._frame.dtype)
+        self._header['magic'] = SHM_MAGIC
+
+        # Vista directa del contador para no indexar el registro en cada frame
+        self._seq = np.ndarray((1,), dtype='<u8', buffer=self.shm.buf,
+                               offset=HEADER_DTYPE.fields['seq'][1])
+
+    def publish(self, frame_index, timestamp, hands, slider_values, slider_active, pad_states):
+        """Publica el estado de un frame.
+
+        hands es una lista de tuplas
+        (hand_id, label, landmarks[21,3], pinch_distance, pinch_center, palm_center).
+        """
+        f = self._frame
+        n_hands = min(len(hands), self.max_hands)
+        n_sliders = min(len(slider_values), self.max_sliders)
+        n_pads = min(len(pad_states), self.max_pads)
+
+        # Abrir escritura (contador impar)
+        self._seq[0] += 1
+
+        f['frame_index'] = frame_index
+        f['timestamp'] = timestamp
+        f['n_hands'] = n_hands
+        f['n_sliders'] = n_sliders
+        f['n_pads'] = n_pads
+
+        hand_id = f['hand_id']
+        handedness = f['handedness']
+        landmarks = f['landmarks']
+        pinch_distance = f['pinch_distance']
+        pinch_center = f['pinch_center']
+        palm_center = f['palm_center']
+
+        for i in range(n_hands):
+            hid, label, lms, distance, pinch_c, palm_c = hands[i]
+            hand_id[i] = hid
+            handedness[i] = handedness_code(label)
+            landmarks[i] = lms
+            pinch_distance[i] = distance
+            pinch_center[i] = pinch_c
+            palm_center[i] = palm_c
+
+        # Slots sin mano
+        hand_id[n_hands:] = -1
+        handedness[n_hands:] = HANDEDNESS_NONE
+
+        f['slider_values'][:n_sliders] = slider_values[:n_sliders]
+        f['slider_active'][:n_sliders] = slider_active[:n_sliders]
+        f['pad_states'][:n_pads] = pad_states[:n_pads]
+
+        # Cerrar escritura (contador par)
+        self._seq[0] += 1
+
+    def close(self):
+        """Libera el bloque compartido (el escritor es el dueño y lo elimina)"""
+        # Los lectores que sigan enganchados ven el bloque como huérfano
+        self._header['magic'] = 0
+        self._seq = None
+        self._header = None
+        self._frame = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# ============================================
+# LECTOR (PROCESOS EXTERNOS)
+# ============================================
+
+class LandmarkReader:
+    def __init__(self, name=SHM_NAME):
+        self.name = name
+        self._attach()
+
+    def _attach(self):
+        name = self.name
+        # track=False: el lector no debe eliminar el bloque al salir
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13 no tiene 'track'
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Sin esto el resource_tracker del lector borra el bloque al salir
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        self._header, self._frame = _map_block(self.shm.buf)
+        error = None
+        if int(self._header['magic']) != SHM_MAGIC:
+            error = f"El bloque '{name}' no contiene datos del controlador"
+        elif int(self._header['version']) != SHM_VERSION:
+            error = f"Versión de bloque no soportada: {int(self._header['version'])}"
+        if error is not None:
+            self.close()
+            raise RuntimeError(error)
+
+        self._seq = np.ndarray((1,), dtype='<u8', buffer=self.shm.buf,
+                               offset=HEADER_DTYPE.fields['seq'][1])
+        self.dtype = self._frame.dtype
+        self.run_id = int(self._header['run_id'])
+        self._last_seq = 0
+
+    def is_stale(self, max_age=None):
+        """True si el bloque ya no es el del controlador en curso.
+
+        Pasa cuando el controlador cerró o se reinició (hay que llamar a
+        reopen()). Con max_age (segundos), también si el último frame
+        publicado es más viejo que eso o si todavía no hay ninguno
+        (controlador colgado o recién arrancado).
+        """
+        if self._header is None:
+            return True  # Cerrado o reopen() fallido
+        if int(self._header['magic']) != SHM_MAGIC or int(self._header['run_id']) != self.run_id:
+            return True
+        if max_age is not None:
+            timestamp = float(self._frame['timestamp'])
+            return timestamp == 0 or time.monotonic() - timestamp > max_age
+        return False
+
+    def reopen(self):
+        """Se engancha de nuevo al bloque actual (FileNotFoundError si no hay controlador)"""
+        self.close()
+        self._attach()
+
+    def read(self, out=None, max_retries=1000):
+        """Copia el último frame publicado en 'out' (o en un registro nuevo).
+
+        Devuelve None si todavía no se publicó ningún frame, si el escritor
+        no soltó el bloque tras max_retries intentos o si el bloque quedó
+        huérfano (ver is_stale() y reopen()).
+        """
+        if out is None:
+            out = np.zeros((), dtype=self.dtype)
+
+        if self.is_stale():
+            return None
+
+        for _ in range(max_retries):
+            seq_before = int(self._seq[0])
+            if seq_before & 1:
+                continue  # Escritura en curso
+            out[...] = self._frame
+            if int(self._seq[0]) == seq_before:
+                if seq_before == 0:
+                    return None
+                self._last_seq = seq_before
+                return out
+        return None
+
+    def has_new_frame(self):
+        """True si hay un frame publicado que todavía no se leyó"""
+        seq = int(self._seq[0])
+        return not (seq & 1) and seq != self._last_seq and seq != 0 and not self.is_stale()
+
+    def close(self):
+        self._seq = None
+        self._header = None
+        self._frame = None
+        self.shm.close()
+
+
+# ============================================
+# DEMO DEL LECTOR
+# ============================================
+
+if __name__ == "__main__":
+    reader = LandmarkReader()
+    state = np.zeros((), dtype=reader.dtype)
+    print("📡 Leyendo landmarks compartidos (Ctrl+C para salir)")
+    try:
+        while True:
+            if reader.is_stale():
+                # El controlador se cerró o se reinició: esperar el bloque nuevo
+                try:
+                    reader.reopen()
+                    state = np.zeros((), dtype=reader.dtype)
+                    print("🔄 Reconectado a un controlador nuevo")
+                except (FileNotFoundError, RuntimeError):
+                    time.sleep(0.5)
+                    continue
+            if reader.has_new_frame() and reader.read(state) is not None:
+                age_ms = (time.monotonic() - float(state['timestamp'])) * 1000
+                n = int(state['n_hands'])
+                palms = [tuple(int(v) for v in state['palm_center'][i]) for i in range(n)]
+                print(f"Frame {int(state['frame_index'])} | {n} manos | "
+                      f"palmas {palms} | sliders {list(state['slider_values'])} | "
+                      f"pads {list(state['pad_states'])} | edad {age_ms:.1f} ms")
+            time.sleep(0.005)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
@@ -0,0 +1,370 @@
+import json
+import os
+
+import numpy as np
+
+# ============================================
+# MOTOR DE MAPEOS GESTO → MIDI
+# ============================================
+#
+# Los mapeos se declaran en un archivo JSON (ver mapeos.json): cada mapeo
+# tiene una fuente (pinza, altura de la mano, rotación de muñeca...), una
+# mano, una zona de la pantalla, una curva y un destino (CC o nota).
+# Al cargar, cada set de mapeos se compila en arrays NumPy y en cada frame
+# se evalúan TODOS los mapeos a la vez sobre el array de landmarks, así el
+# costo por frame casi no crece con la cantidad de mapeos.
+#
+# Formato:
+#   {
+#     "active_set": "efectos",
+#     "sets": {
+#       "efectos": [
+#         {"name": "Filtro", "source": "pinch", "hand": "Left",
+#          "zone": [0.0, 0.0, 0.5, 0.5], "range": [0.03, 0.25],
+#          "curve": "exp", "smoothing": 0.5,
+#          "target": {"type": "cc", "cc": 22}},
+#         ...
+#       ]
+#     }
+#   }
+#
+# Coordenadas: zonas en coordenadas normalizadas de la imagen (0-1).
+# Las distancias (pinza) están en fracciones del ALTO del frame.
+
+# Fuentes disponibles (índice = fila de la matriz de fuentes)
+SOURCES = (
+    'pinch',           # Distancia pulgar-índice
+    'hand_height',     # 1 = arriba, 0 = abajo
+    'hand_x',          # 0 = izquierda, 1 = derecha
+    'wrist_rotation',  # Grados, 0 = dedos hacia arriba, + = horario
+    'finger_spread',   # Separación media entre puntas / tamaño de palma
+)
+
+# Rango de entrada por defecto de cada fuente
+SOURCE_RANGES = {
+    'pinch': (0.02, 0.25),
+    'hand_height': (0.0, 1.0),
+    'hand_x': (0.0, 1.0),
+    'wrist_rotation': (-60.0, 60.0),
+    'finger_spread': (0.2, 0.9),
+}
+
+# Punto que se usa para decidir si la mano está en la zona
+ZONE_POINT_PALM = 0
+ZONE_POINT_PINCH = 1
+SOURCE_ZONE_POINT = {'pinch': ZONE_POINT_PINCH}
+
+# Curvas con nombre → exponente (valor ** gamma)
+CURVES = {
+    'linear': 1.0,
+    'exp': 2.0,
+    'log': 0.5,
+}
+
+HANDS = {'any': -1, 'Left': 0, 'Right': 1}
+
+TARGET_CC = 0
+TARGET_NOTE = 1
+
+FINGER_TIPS = [4, 8, 12, 16, 20]
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _numbers(label, key, value, length):
+    """Valida una lista de `length` números (zona, rangos)"""
+    if (not isinstance(value, (list, tuple)) or len(value) != length
+            or not all(_is_number(v) for v in value)):
+        raise ValueError(f"Mapeo '{label}': '{key}' debe ser una lista de {length} números")
+    return [float(v) for v in value]
+
+
+def _integer(label, key, value, lo, hi):
+    """Valida un entero MIDI en [lo, hi]"""
+    if not isinstance(value, int) or isinstance(value, bool) or not lo <= value <= hi:
+        raise ValueError(f"Mapeo '{label}': '{key}' debe ser un entero entre {lo} y {hi} "
+                         f"(vale {value!r})")
+    return value
+
+
+class MappingSet:
+    """Set de mapeos compilado en arrays (una posición por mapeo)"""
+
+    def __init__(self, name, mappings, default_channel=0):
+        self.name = name
+        self.names = []
+        m = len(mappings)
+
+        self.source = np.zeros(m, dtype=np.intp)
+        self.zone_point = np.zeros(m, dtype=np.intp)
+        self.hand = np.full(m, -1, dtype=np.int8)
+        self.zone = np.tile(np.array([0.0, 0.0, 1.0, 1.0]), (m, 1))
+        self.in_lo = np.zeros(m)
+        self.in_hi = np.ones(m)
+        self.gamma = np.ones(m)
+        self.invert = np.zeros(m, dtype=bool)
+        self.out_lo = np.zeros(m)
+        self.out_hi = np.full(m, 127.0)
+        self.alpha = np.zeros(m)
+        self.deadzone = np.full(m, 2, dtype=np.int16)
+        self.kind = np.zeros(m, dtype=np.int8)
+        self.channel = np.full(m, default_channel, dtype=np.int16)
+        self.number = np.zeros(m, dtype=np.int16)
+        self.velocity = np.full(m, -1, dtype=np.int16)  # -1 = usar el valor
+
+        for i, mapping in enumerate(mappings):
+            self._compile(i, mapping)
+
+        # Estado por mapeo
+        self.reset()
+
+    def _compile(self, i, mapping):
+        if not isinstance(mapping, dict):
+            raise ValueError(f"Mapeo '{self.name}[{i}]': debe ser un objeto")
+        label = mapping.get('name', f"{self.name}[{i}]")
+        self.names.append(label)
+
+        source = mapping.get('source')
+        if not isinstance(source, str) or source not in SOURCES:
+            raise ValueError(f"Mapeo '{label}': fuente desconocida '{source}'")
+        self.source[i] = SOURCES.index(source)
+        self.zone_point[i] = SOURCE_ZONE_POINT.get(source, ZONE_POINT_PALM)
+
+        hand = mapping.get('hand', 'any')
+        if not isinstance(hand, str) or hand not in HANDS:
+            raise ValueError(f"Mapeo '{label}': mano desconocida '{hand}'")
+        self.hand[i] = HANDS[hand]
+
+        if 'zone' in mapping:
+            self.zone[i] = _numbers(label, 'zone', mapping['zone'], 4)
+
+        self.in_lo[i], self.in_hi[i] = _numbers(
+            label, 'range', mapping.get('range', SOURCE_RANGES[source]), 2)
+        if self.in_hi[i] == self.in_lo[i]:
+            raise ValueError(f"Mapeo '{label}': rango de entrada vacío")
+
+        curve = mapping.get('curve', 'linear')
+        if _is_number(curve):
+            if curve <= 0:
+                raise ValueError(f"Mapeo '{label}': el exponente de 'curve' debe ser > 0")
+            self.gamma[i] = curve
+        elif isinstance(curve, str) and curve in CURVES:
+            self.gamma[i] = CURVES[curve]
+        else:
+            raise ValueError(f"Mapeo '{label}': curva desconocida '{curve}'")
+
+        self.invert[i] = bool(mapping.get('invert', False))
+        output = _numbers(label, 'output', mapping.get('output', (0, 127)), 2)
+        if not all(0 <= v <= 127 for v in output):
+            raise ValueError(f"Mapeo '{label}': 'output' debe estar entre 0 y 127")
+        self.out_lo[i], self.out_hi[i] = output
+
+        smoothing = mapping.get('smoothing', 0.0)
+        if not _is_number(smoothing) or not 0 <= smoothing < 1:
+            raise ValueError(f"Mapeo '{label}': 'smoothing' debe estar en [0, 1)")
+        self.alpha[i] = smoothing
+        self.deadzone[i] = _integer(label, 'deadzone', mapping.get('deadzone', 2), 0, 127)
+
+        target = mapping.get('target', {})
+        if not isinstance(target, dict):
+            raise ValueError(f"Mapeo '{label}': 'target' debe ser un objeto")
+        target_type = target.get('type')
+        if target_type == 'cc':
+            self.kind[i] = TARGET_CC
+            self.number[i] = _integer(label, 'cc', target.get('cc'), 0, 127)
+        elif target_type == 'note':
+            self.kind[i] = TARGET_NOTE
+            self.number[i] = _integer(label, 'note', target.get('note'), 0, 127)
+            if 'velocity' in target:
+                self.velocity[i] = _integer(label, 'velocity', target['velocity'], 1, 127)
+        else:
+            raise ValueError(f"Mapeo '{label}': destino desconocido '{target_type}'")
+        if 'channel' in target:
+            self.channel[i] = _integer(label, 'channel', target['channel'], 0, 15)
+
+    def __len__(self):
+        return len(self.names)
+
+    def reset(self):
+        m = len(self.names)
+        self.value = np.zeros(m, dtype=np.int16)
+        self.smoothed = np.zeros(m)
+        self.active = np.zeros(m, dtype=bool)
+        self.last_sent = np.full(m, -1, dtype=np.int16)
+        self.note_on = np.zeros(m, dtype=bool)
+
+    def held_notes(self):
+        """Mensajes note_off (canal, nota, 0) para las notas que quedaron sonando"""
+        held = np.flatnonzero(self.note_on)
+        self.note_on[held] = False
+        return [(int(self.channel[i]), int(self.number[i]), 0) for i in held]
+
+
+def compute_sources(landmarks, aspect):
+    """Calcula todas las fuentes para todas las manos.
+
+    landmarks: (H, 21, 3) normalizados. aspect: ancho / alto del frame.
+    Devuelve (sources[K, H], zone_points[2, H, 2]).
+    """
+    xy = landmarks[:, :, :2].astype(np.float64)
+    # Coordenadas isotrópicas (x escalada al alto del frame) para distancias y ángulos
+    iso = xy * np.array([aspect, 1.0])
+
+    palm = (xy[:, 0] + xy[:, 9]) * 0.5
+    pinch_center = (xy[:, 4] + xy[:, 8]) * 0.5
+
+    pinch = np.linalg.norm(iso[:, 4] - iso[:, 8], axis=1)
+
+    palm_vector = iso[:, 9] - iso[:, 0]
+    wrist_rotation = np.degrees(np.arctan2(palm_vector[:, 0], -palm_vector[:, 1]))
+
+    palm_size = np.maximum(np.linalg.norm(palm_vector, axis=1), 1e-6)
+    tips = iso[:, FINGER_TIPS]
+    spread = np.linalg.norm(np.diff(tips, axis=1), axis=2).mean(axis=1) / palm_size
+
+    sources = np.stack([
+        pinch,
+        1.0 - palm[:, 1],
+        palm[:, 0],
+        wrist_rotation,
+        spread,
+    ])
+    zone_points = np.stack([palm, pinch_center])
+    return sources, zone_points
+
+
+def evaluate_set(mapping_set, landmarks, handedness, aspect):
+    """Evalúa todos los mapeos de un set en un frame.
+
+    landmarks: (H, 21, 3) normalizados; handedness: (H,) con 0 = Left,
+    1 = Right, -1 = slot sin mano. Devuelve (cc, note_on, note_off), listas
+    de tuplas (canal, número, valor) listas para enviar por MIDI.
+    """
+    ms = mapping_set
+    m = len(ms)
+    if m == 0:
+        return [], [], []
+
+    handedness = np.asarray(handedness)
+    present = handedness >= 0
+
+    if present.any():
+        sources, zone_points = compute_sources(landmarks, aspect)
+        values_all = sources[ms.source]          # (M, H)
+        points = zone_points[ms.zone_point]      # (M, H, 2)
+
+        hand_ok = present[None, :] & ((ms.hand[:, None] == -1) |
+                                      (ms.hand[:, None] == handedness[None, :]))
+        in_zone = ((points[:, :, 0] >= ms.zone[:, 0:1]) &
+                   (points[:, :, 1] >= ms.zone[:, 1:2]) &
+                   (points[:, :, 0] <= ms.zone[:, 2:3]) &
+                   (points[:, :, 1] <= ms.zone[:, 3:4]))
+        ok = hand_ok & in_zone
+
+        active = ok.any(axis=1)
+        slot = ok.argmax(axis=1)                 # Primera mano que cumple
+        raw = values_all[np.arange(m), slot]
+    else:
+        active = np.zeros(m, dtype=bool)
+        raw = np.zeros(m)
+
+    # Rango → curva → salida
+    normalized = np.clip((raw - ms.in_lo) / (ms.in_hi - ms.in_lo), 0.0, 1.0)
+    normalized = np.where(ms.invert, 1.0 - normalized, normalized) ** ms.gamma
+    output = ms.out_lo + normalized * (ms.out_hi - ms.out_lo)
+
+    # Suavizado exponencial (al entrar a la zona arranca desde el valor actual)
+    smoothed = np.where(ms.active, ms.alpha * ms.smoothed + (1.0 - ms.alpha) * output, output)
+    ms.smoothed = np.where(active, smoothed, ms.smoothed)
+    ms.value = np.clip(np.rint(ms.smoothed), 0, 127).astype(np.int16)
+    ms.active = active
+
+    is_cc = ms.kind == TARGET_CC
+    is_note = ~is_cc
+
+    # CC: solo si cambió más que la deadzone
+    send_cc = np.flatnonzero(active & is_cc & (np.abs(ms.value - ms.last_sent) >= ms.deadzone))
+    ms.last_sent[send_cc] = ms.value[send_cc]
+    cc = [(int(ms.channel[i]), int(ms.number[i]), int(ms.value[i])) for i in send_cc]
+
+    # Notas: flanco de subida/bajada de la zona
+    start = np.flatnonzero(active & is_note & ~ms.note_on)
+    stop = np.flatnonzero(~active & is_note & ms.note_on)
+    ms.note_on[start] = True
+    ms.note_on[stop] = False
+    velocity = np.where(ms.velocity >= 0, ms.velocity, np.maximum(ms.value, 1))
+    note_on = [(int(ms.channel[i]), int(ms.number[i]), int(velocity[i])) for i in start]
+    note_off = [(int(ms.channel[i]), int(ms.number[i]), 0) for i in stop]
+
+    return cc, note_on, note_off
+
+
+class MappingEngine:
+    def __init__(self, path, default_channel=0):
+        self.path = path
+        self.default_channel = default_channel
+        self.sets = {}
+        self.order = []
+        self.current = None
+        self._mtime = None
+        self.reload()
+
+    def reload(self):
+        """Relee el archivo de mapeos (mantiene el set activo si sigue existiendo).
+
+        Devuelve los note_off de las notas que quedaron sonando en el set anterior.
+        """
+        # La fecha se guarda antes de parsear: un archivo con errores no se
+        # reintenta hasta que vuelva a cambiar
+        self._mtime = os.path.getmtime(self.path)
+        with open(self.path) as f:
+            config = json.load(f)
+
+        if not isinstance(config, dict) or not isinstance(config.get('sets', {}), dict):
+            raise ValueError(f"'{self.path}': se esperaba {{\"sets\": {{nombre: [mapeos]}}}}")
+        for name, mappings in config.get('sets', {}).items():
+            if not isinstance(mappings, list):
+                raise ValueError(f"Set '{name}': debe ser una lista de mapeos")
+
+        sets = {name: MappingSet(name, mappings, self.default_channel)
+                for name, mappings in config.get('sets', {}).items()}
+        if not sets:
+            raise ValueError(f"'{self.path}' no define ningún set de mapeos")
+
+        previous = self.current.name if self.current is not None else None
+        name = previous if previous in sets else config.get('active_set', next(iter(sets)))
+        if not isinstance(name, str) or name not in sets:
+            raise ValueError(f"Set activo desconocido: '{name}'")
+
+        # Validado todo: recién ahora se reemplaza el estado
+        released = self.current.held_notes() if self.current is not None else []
+        self.sets = sets
+        self.order = list(sets)
+        self.current = sets[name]
+        return released
+
+    def has_changed(self):
+        """True si el archivo de mapeos se modificó desde la última carga"""
+        try:
+            return os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return False
+
+    def select(self, name):
+        """Cambia de set sin reiniciar. Devuelve los note_off pendientes"""
+        if not isinstance(name, str) or name not in self.sets:
+            raise ValueError(f"Set de mapeos desconocido: '{name}'")
+        released = self.current.held_notes()
+        self.current = self.sets[name]
+        self.current.reset()
+        return released
+
+    def next_set(self):
+        """Pasa al siguiente set (en el orden del archivo)"""
+        index = (self.order.index(self.current.name) + 1) % len(self.order)
+        return self.select(self.order[index])
+
+    def evaluate(self, landmarks, handedness, aspect):
+        return evaluate_set(self.current, landmarks, handedness, aspect)
@@ -0,0 +1,272 @@
+import heapq
+import threading
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+# ============================================
+# MOTOR DE PADS (ONSET SUB-FRAME + VELOCITY)
+# ============================================
+#
+# En vez de disparar el pad en el frame donde la palma aparece dentro del
+# círculo (onset pegado a la grilla de frames, ±16-33 ms de jitter), el
+# motor guarda un historial corto de posiciones por mano y calcula el
+# instante exacto en que la palma cruzó el borde del pad interpolando
+# entre el frame anterior y el actual. La nota se agenda en
+# (instante de cruce + latencia fija): el jitter se convierte en una
+# latencia constante. La velocidad de acercamiento se mapea a velocity MIDI.
+
+PadHit = namedtuple('PadHit', ['pad', 'hand', 'time', 'velocity', 'speed'])
+
+
+class PadEngine:
+    def __init__(self, centers, radii, min_y=None, history_size=6,
+                 dropout_grace=0.15, velocity_samples=2,
+                 speed_min=0.42, speed_max=4.2,
+                 velocity_min=30, velocity_max=127, velocity_curve=1.0,
+                 default_velocity=100):
+        """centers: lista de (x, y) en espacio normalizado isotrópico
+        (x * ancho/alto, y), en alturas de frame; radii: radio de detección de
+        cada pad en las mismas unidades.
+
+        dropout_grace: segundos que se conserva el estado de una mano que
+        dejó de detectarse. MediaPipe pierde manos por uno o varios frames
+        en movimientos rápidos: si vuelve dentro de este plazo no cuenta
+        como una entrada nueva al pad donde estaba.
+
+        velocity_samples: muestras (las más recientes) con las que se estima
+        la velocidad de acercamiento. 2 = velocidad del segmento de cruce; un
+        golpe que arranca quieto no debe quedar promediado con el reposo.
+
+        speed_min/speed_max: velocidad de acercamiento (alturas de frame/s)
+        que se mapea a velocity_min/velocity_max. velocity_curve < 1 favorece
+        golpes suaves, > 1 exige golpes más rápidos para llegar a velocity alta.
+        """
+        self.centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        self.radii = np.asarray(radii, dtype=np.float64).reshape(-1)
+        self.radii_sq = self.radii ** 2
+        self.min_y = min_y
+
+        self.history_size = history_size
+        self.dropout_grace = dropout_grace
+        self.velocity_samples = max(2, velocity_samples)
+        self.speed_min = speed_min
+        self.speed_max = speed_max
+        self.velocity_min = velocity_min
+        self.velocity_max = velocity_max
+        self.velocity_curve = velocity_curve
+        self.default_velocity = default_velocity
+
+        # Por mano: historial (t, x, y), pads donde está la palma y último
+        # instante en que se la vio
+        self.history = {}
+        self.inside = {}
+        self.last_seen = {}
+
+    def _is_inside(self, x, y):
+        """Máscara de pads que contienen el punto (x, y)"""
+        d_sq = (self.centers[:, 0] - x) ** 2 + (self.centers[:, 1] - y) ** 2
+        inside = d_sq < self.radii_sq
+        if self.min_y is not None and y < self.min_y:
+            inside[:] = False
+        return inside
+
+    def _estimate_velocity(self, samples):
+        """Velocidad (vx, vy) en alturas de frame/s por mínimos cuadrados sobre
+        las últimas velocity_samples muestras (con 2, la del segmento de cruce)"""
+        if len(samples) < 2:
+            return 0.0, 0.0
+        data = np.asarray(samples, dtype=np.float64)[-self.velocity_samples:]
+        t = data[:, 0] - data[:, 0].mean()
+        denom = (t * t).sum()
+        if denom <= 0:
+            return 0.0, 0.0
+        vx = (t * (data[:, 1] - data[:, 1].mean())).sum() / denom
+        vy = (t * (data[:, 2] - data[:, 2].mean())).sum() / denom
+        return vx, vy
+
+    def _crossing_fraction(self, pad, x0, y0, x1, y1):
+        """Fracción s en [0, 1] del segmento p0→p1 donde la palma entra al pad"""
+        cx, cy = self.centers[pad]
+        dx, dy = x1 - x0, y1 - y0
+        fx, fy = x0 - cx, y0 - cy
+
+        s = 0.0
+
+        # Entrada al círculo: |p0 + s·d - c|² = r²  (raíz menor)
+        if fx * fx + fy * fy >= self.radii_sq[pad]:
+            a = dx * dx + dy * dy
+            b = 2 * (fx * dx + fy * dy)
+            c = fx * fx + fy * fy - self.radii_sq[pad]
+            disc = b * b - 4 * a * c
+            if a > 0 and disc >= 0:
+                s = max(s, (-b - disc ** 0.5) / (2 * a))
+            else:
+                s = 1.0
+
+        # Entrada a la zona de pads (cruce de la línea min_y)
+        if self.min_y is not None and y0 < self.min_y and dy > 0:
+            s = max(s, (self.min_y - y0) / dy)
+
+        return min(max(s, 0.0), 1.0)
+
+    def speed_to_velocity(self, speed):
+        """Mapea velocidad de acercamiento (alturas de frame/s) a velocity MIDI (1-127)"""
+        span = self.speed_max - self.speed_min
+        normalized = (speed - self.speed_min) / span if span > 0 else 1.0
+        normalized = min(max(normalized, 0.0), 1.0) ** self.velocity_curve
+        velocity = self.velocity_min + normalized * (self.velocity_max - self.velocity_min)
+        return int(min(max(round(velocity), 1), 127))
+
+    def update(self, timestamp, palms):
+        """Procesa un frame.
+
+        timestamp: instante de captura del frame (time.monotonic()).
+        palms: dict mano -> (x, y) del centro de la palma en el espacio de centers.
+        Devuelve la lista de PadHit con el instante de cruce interpolado.
+        """
+        hits = []
+
+        # Manos que desaparecieron: olvidar su estado pasado el plazo de gracia
+        for hand in list(self.history):
+            if hand not in palms and timestamp - self.last_seen[hand] > self.dropout_grace:
+                del self.history[hand]
+                del self.inside[hand]
+                del self.last_seen[hand]
+
+        for hand, (x, y) in palms.items():
+            samples = self.history.get(hand)
+            if samples is None:
+                samples = deque(maxlen=self.history_size)
+                self.history[hand] = samples
+                self.inside[hand] = np.zeros(len(self.centers), dtype=bool)
+
+            self.last_seen[hand] = timestamp
+            previous = samples[-1] if samples else None
+            samples.append((timestamp, float(x), float(y)))
+
+            was_inside = self.inside[hand]
+            is_inside = self._is_inside(x, y)
+            entered = np.flatnonzero(is_inside & ~was_inside)
+            self.inside[hand] = is_inside
+
+            if len(entered) == 0:
+                continue
+
+            if previous is None:
+                # Primera muestra de la mano: no hay de dónde interpolar
+                for pad in entered:
+                    hits.append(PadHit(int(pad), hand, timestamp,
+                                       self.default_velocity, 0.0))
+                continue
+
+            t0, x0, y0 = previous
+            vx, vy = self._estimate_velocity(samples)
+
+            for pad in entered:
+                s = self._crossing_fraction(pad, x0, y0, float(x), float(y))
+                hit_time = t0 + s * (timestamp - t0)
+                hit_x = x0 + s * (x - x0)
+                hit_y = y0 + s * (y - y0)
+
+                # Velocidad de acercamiento = componente radial hacia el centro
+                cx, cy = self.centers[pad]
+                to_center_x, to_center_y = cx - hit_x, cy - hit_y
+                norm = (to_center_x ** 2 + to_center_y ** 2) ** 0.5
+                if norm > 0:
+                    speed = max(0.0, (vx * to_center_x + vy * to_center_y) / norm)
+                else:
+                    speed = (vx * vx + vy * vy) ** 0.5
+
+                hits.append(PadHit(int(pad), hand, float(hit_time),
+                                   self.speed_to_velocity(speed), float(speed)))
+
+        hits.sort(key=lambda hit: hit.time)
+        return hits
+
+
+# ============================================
+# AGENDA DE NOTAS (HILO DE ENVÍO)
+# ============================================
+
+class NoteScheduler:
+    """Envía mensajes MIDI en instantes precisos (time.monotonic()) desde un hilo"""
+
+    def __init__(self, midi_out):
+        self.midi_out = midi_out
+        self._queue = []
+        self._counter = 0  # Desempate estable en el heap
+        self._keyed = {}   # key -> entrada pendiente (para reemplazarla)
+        self.late = 0      # Mensajes agendados para un instante que ya pasó
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="agenda-notas", daemon=True)
+        self._thread.start()
+
+    def schedule(self, when, msg, key=None):
+        """Agenda msg para el instante when (si ya pasó, sale enseguida).
+
+        Con key, reemplaza el mensaje pendiente agendado con la misma key
+        (p. ej. el note_off de un pad que se volvió a golpear).
+        Devuelve True si when ya había pasado (el mensaje sale tarde).
+        """
+        late = when < time.monotonic()
+        entry = [when, self._counter, msg, key]
+        with self._condition:
+            if key is not None:
+                previous = self._keyed.get(key)
+                if previous is not None:
+                    previous[2] = None  # Cancelado: el hilo lo descarta
+                self._keyed[key] = entry
+            heapq.heappush(self._queue, entry)
+            self._counter += 1
+            if late:
+                self.late += 1
+            self._condition.notify()
+        return late
+
+    def _pop(self):
+        _, _, msg, key = entry = heapq.heappop(self._queue)
+        if key is not None and self._keyed.get(key) is entry:
+            del self._keyed[key]
+        return msg
+
+    def _next_due(self):
+        """Espera al próximo mensaje vencido y lo saca de la cola (None al cerrar)"""
+        with self._condition:
+            while self._running:
+                if not self._queue:
+                    self._condition.wait()
+                    continue
+                when = self._queue[0][0]
+                delay = when - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                entry = self._queue[0]
+                self._pop()
+                return entry
+            return None
+
+    def _run(self):
+        while True:
+            entry = self._next_due()
+            if entry is None:
+                break
+            # El envío (puerto + grabador) va fuera del lock: schedule() no espera
+            msg = entry[2]
+            if msg is not None:
+                self.midi_out.send(msg)
+
+    def close(self, flush=True):
+        """Detiene el hilo. Con flush=True envía antes lo que quede agendado"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+        if flush:
+            while self._queue:
+                msg = self._pop()
+                if msg is not None:
+                    self.midi_out.send(msg)
@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from captura_camara import OFFSET_WARMUP_FRAMES, _DriverClock  # noqa: E402
+
+FRAME = 1 / 30
+
+
+def test_monotonic_driver_timestamps_are_used_as_is():
+    clock = _DriverClock()
+    assert clock.convert(1000.0, 1.010) == pytest.approx(1.0)
+    assert clock.convert(1033.3, 1.045) == pytest.approx(1.0333)
+    assert clock.mode == 'driver'
+
+
+def test_other_time_base_uses_minimum_offset():
+    clock = _DriverClock()
+    # ms desde el inicio del stream, read() muy posterior
+    assert clock.convert(10.0, 500.02) == pytest.approx(500.02)
+    assert clock.mode == 'offset'
+    assert clock.convert(43.3, 500.045) == pytest.approx(500.045)
+    assert clock.offset == pytest.approx(500.045 - 0.0433)
+
+
+def test_missing_driver_timestamps_fall_back_to_read_time():
+    clock = _DriverClock()
+    assert clock.convert(0.0, 5.0) == 5.0
+    assert clock.convert(1000.0, 5.1) == 5.1  # La base no cambia a mitad de sesión
+    assert clock.mode == 'read'
+
+
+def test_repeated_or_missing_timestamp_keeps_time_base():
+    clock = _DriverClock()
+    first = clock.convert(1000.0, 1.010)
+    second = clock.convert(1000.0, 1.045)   # Repetido
+    third = clock.convert(0.0, 1.078)       # Ausente
+    fourth = clock.convert(1100.0, 1.112)
+    assert clock.mode == 'driver'
+    assert clock.anomalies == 2
+    assert first < second < third < fourth
+    assert second == pytest.approx(first + 0.035)
+    assert fourth == pytest.approx(1.1)
+
+
+def test_offset_mode_timestamps_never_go_backwards():
+    rng = random.Random(0)
+    clock = _DriverClock()
+    previous = None
+    for i in range(OFFSET_WARMUP_FRAMES * 3):
+        driver_ms = 10.0 + i * FRAME * 1000
+        read_time = 500.0 + i * FRAME + rng.uniform(0.005, 0.030)
+        timestamp = clock.convert(driver_ms, read_time)
+        if previous is not None:
+            assert timestamp > previous
+        previous = timestamp
+    offset = clock.offset
+    clock.convert(10.0 + 1000 * FRAME * 1000, 500.0 + 1000 * FRAME)  # Menor offset posible
+    assert clock.offset == offset  # Congelado después del warm-up
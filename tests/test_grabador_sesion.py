@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+
+import mido
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grabador_sesion import SessionRecorder, load_session  # noqa: E402
+
+STAGES = ("captura", "logica")
+
+
+def make_recorder(directory, chunk_frames=4):
+    return SessionRecorder(str(directory), max_hands=2, n_sliders=2, n_pads=2,
+                           stage_names=STAGES, chunk_frames=chunk_frames, n_chunks=4,
+                           metadata={'midi_port': "test"})
+
+
+def record(recorder, n_frames, hits):
+    """Graba n_frames; hits: dict frame -> pad golpeado (con su note_on)"""
+    counts = [0, 0]
+    landmarks = np.arange(21 * 3, dtype=np.float32).reshape(21, 3)
+    for frame_index in range(1, n_frames + 1):
+        recorder.begin_frame(frame_index)
+        if frame_index in hits:
+            pad = hits[frame_index]
+            counts[pad] += 1
+            recorder.record_midi(mido.Message('note_on', note=36 + pad, velocity=100))
+        recorder.record_frame(frame_index, frame_index / 60, [("Left", landmarks)],
+                              [frame_index % 128, 0], counts, [1.0, 2.0])
+
+
+def test_round_trip_with_partial_last_chunk(tmp_path):
+    recorder = make_recorder(tmp_path)
+    # 10 frames con chunks de 4: el último chunk queda parcial (2 filas)
+    record(recorder, 10, {1: 0, 6: 1, 7: 1})
+    recorder.close()
+
+    meta, frames, events = load_session(str(tmp_path))
+    assert meta['closed'] is True
+    assert meta['midi_port'] == "test"
+    assert meta['stage_names'] == list(STAGES)
+    assert frames['frame_index'].tolist() == list(range(1, 11))
+    assert frames['handedness'][:, 0].tolist() == [0] * 10
+    assert (frames['handedness'][:, 1] == -1).all()
+    assert frames['stage_ms'].shape == (10, len(STAGES))
+
+    # El golpe del primer frame también cuenta
+    triggers = frames['pad_triggers']
+    assert np.flatnonzero(triggers[:, 0]).tolist() == [0]
+    assert np.flatnonzero(triggers[:, 1]).tolist() == [5, 6]
+
+    # Los eventos llevan el frame marcado con begin_frame
+    assert events['frame_index'].tolist() == [1, 6, 7]
+    assert events['midi'][:, 1].tolist() == [36, 37, 37]
+
+
+def test_session_that_was_never_closed_still_loads(tmp_path):
+    recorder = make_recorder(tmp_path)
+    record(recorder, 9, {2: 0})
+    # Sin close(): solo quedan los chunks completos que el hilo ya guardó
+    recorder._jobs.put(None)
+    recorder._writer.join()
+
+    with open(os.path.join(str(tmp_path), 'meta.json')) as f:
+        assert json.load(f)['closed'] is False
+    meta, frames, events = load_session(str(tmp_path))
+    assert meta['closed'] is False
+    assert frames['frame_index'].tolist() == list(range(1, 9))
+    assert np.flatnonzero(frames['pad_triggers'][:, 0]).tolist() == [1]
@@ -0,0 +1,101 @@
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from memoria_compartida import LandmarkPublisher, LandmarkReader  # noqa: E402
+
+READER_SCRIPT = """
+import sys
+from memoria_compartida import LandmarkReader
+reader = LandmarkReader(sys.argv[1])
+assert reader.read() is not None
+reader.close()
+"""
+
+
+def test_reader_process_exit_keeps_block():
+    name = f"relincha_test_{uuid.uuid4().hex[:8]}"
+    publisher = LandmarkPublisher(name, max_hands=2, max_sliders=2, max_pads=4)
+    try:
+        publisher.publish(1, 0.0, [], [0, 0], [False, False], [False] * 4)
+
+        result = subprocess.run([sys.executable, "-c", READER_SCRIPT, name],
+                                cwd=ROOT, capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+        assert "leaked shared_memory" not in result.stderr
+
+        # El bloque sigue existiendo: otro lector puede engancharse
+        result = subprocess.run([sys.executable, "-c", READER_SCRIPT, name],
+                                cwd=ROOT, capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+    finally:
+        publisher.close()
+
+
+def publish(publisher, frame_index, timestamp):
+    publisher.publish(frame_index, timestamp, [], [0, 0], [False, False], [False] * 4)
+
+
+def test_reader_detects_controller_restart_and_reopens():
+    name = f"relincha_test_{uuid.uuid4().hex[:8]}"
+    first = LandmarkPublisher(name)
+    publish(first, 1, time.monotonic())
+    reader = LandmarkReader(name)
+    try:
+        assert not reader.is_stale()
+        assert int(reader.read()['frame_index']) == 1
+
+        # Cierre limpio + reinicio: el lector queda en el bloque huérfano
+        first.close()
+        second = LandmarkPublisher(name)
+        try:
+            publish(second, 7, time.monotonic())
+            assert reader.is_stale()
+            assert reader.read() is None
+            assert not reader.has_new_frame()
+
+            reader.reopen()
+            assert not reader.is_stale()
+            assert int(reader.read()['frame_index']) == 7
+        finally:
+            second.close()
+    finally:
+        reader.close()
+
+
+def test_reader_detects_block_reused_after_crash():
+    name = f"relincha_test_{uuid.uuid4().hex[:8]}"
+    first = LandmarkPublisher(name)
+    publish(first, 1, time.monotonic())
+    reader = LandmarkReader(name)
+    # Sin close() (crash): el controlador nuevo reutiliza el mismo bloque
+    second = LandmarkPublisher(name)
+    try:
+        assert reader.is_stale()
+        reader.reopen()
+        publish(second, 2, time.monotonic())
+        assert int(reader.read()['frame_index']) == 2
+    finally:
+        reader.close()
+        second.close()
+        first.shm.close()
+
+
+def test_reader_max_age_flags_old_frames():
+    name = f"relincha_test_{uuid.uuid4().hex[:8]}"
+    publisher = LandmarkPublisher(name)
+    reader = LandmarkReader(name)
+    try:
+        assert reader.is_stale(max_age=1.0)   # Todavía no hay frames
+        publish(publisher, 1, time.monotonic())
+        assert not reader.is_stale(max_age=1.0)
+        publish(publisher, 2, time.monotonic() - 5.0)
+        assert reader.is_stale(max_age=1.0)
+    finally:
+        reader.close()
+        publisher.close()
@@ -0,0 +1,81 @@
+import copy
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from motor_mapeos import MappingEngine  # noqa: E402
+
+BASE_MAPPING = {
+    "name": "filtro",
+    "source": "hand_height",
+    "hand": "Left",
+    "curve": "exp",
+    "target": {"type": "cc", "cc": 22},
+}
+
+
+def write_config(tmp_path, config):
+    path = tmp_path / "mapeos.json"
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+def config_with(**overrides):
+    mapping = copy.deepcopy(BASE_MAPPING)
+    for key, value in overrides.items():
+        mapping[key] = value
+    return {"sets": {"a": [mapping]}}
+
+
+def test_valid_config_loads(tmp_path):
+    engine = MappingEngine(write_config(tmp_path, config_with()))
+    assert engine.current.name == "a"
+    assert len(engine.current) == 1
+
+
+@pytest.mark.parametrize("config", [
+    config_with(hand=["Left"]),
+    config_with(source=["pinch"]),
+    config_with(curve=["exp"]),
+    config_with(curve=0),
+    config_with(curve=-1),
+    config_with(range=5),
+    config_with(zone=5),
+    config_with(zone=[0, 0, 1]),
+    config_with(output=[0, 300]),
+    config_with(smoothing="x"),
+    config_with(target={"type": "cc", "cc": 200}),
+    config_with(target={"type": "cc", "cc": 22, "channel": 20}),
+    config_with(target={"type": "note", "note": 48, "velocity": 300}),
+    config_with(target=["cc"]),
+    dict(config_with(), active_set=["a"]),
+    dict(config_with(), active_set="b"),
+    {"sets": {"a": {"source": "pinch"}}},
+    {"sets": []},
+    {"sets": {}},
+    ["a"],
+])
+def test_malformed_config_raises_value_error(tmp_path, config):
+    with pytest.raises(ValueError):
+        MappingEngine(write_config(tmp_path, config))
+
+
+def test_failed_reload_keeps_active_set(tmp_path):
+    path = write_config(tmp_path, config_with())
+    engine = MappingEngine(path)
+    current = engine.current
+
+    write_config(tmp_path, config_with(hand=["Left"]))
+    with pytest.raises(ValueError):
+        engine.reload()
+    assert engine.current is current
+
+    write_config(tmp_path, dict(config_with(), active_set=["a"]))
+    # El set activo se conserva, así que active_set no se consulta
+    engine.reload()
+    assert engine.current.name == "a"
@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+
+import mido
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from motor_pads import NoteScheduler, PadEngine  # noqa: E402
+
+FPS = 30
+
+
+def run_frames(engine, positions, hand="Left", start=0.0):
+    """Alimenta el motor con una posición por frame (None = mano perdida)"""
+    hits = []
+    for i, position in enumerate(positions):
+        palms = {} if position is None else {hand: position}
+        hits += engine.update(start + i / FPS, palms)
+    return hits
+
+
+class RecordingOutput:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, msg):
+        self.sent.append(msg)
+
+
+# ----- Cruce sub-frame -----
+
+def test_crossing_fraction_circle_entry():
+    engine = PadEngine([(0.0, 0.0)], [1.0])
+    assert engine._crossing_fraction(0, -2.0, 0.0, 0.0, 0.0) == pytest.approx(0.5)
+
+
+def test_crossing_fraction_min_y_line_entry():
+    # Ya dentro del círculo en ambos extremos: el cruce lo define la línea min_y
+    engine = PadEngine([(0.0, 1.0)], [10.0], min_y=0.5)
+    assert engine._crossing_fraction(0, 0.0, 0.0, 0.0, 1.0) == pytest.approx(0.5)
+
+
+def test_hit_time_is_interpolated_between_frames():
+    engine = PadEngine([(0.5, 0.8)], [0.1])
+    hits = run_frames(engine, [(0.5, 0.6), (0.5, 0.8)])
+    assert len(hits) == 1
+    # Borde en y = 0.7: a mitad del segmento entre los dos frames
+    assert hits[0].time == pytest.approx(0.5 / FPS)
+
+
+# ----- Velocity -----
+
+def test_speed_to_velocity_mapping():
+    engine = PadEngine([(0.0, 0.0)], [1.0], speed_min=1.0, speed_max=3.0,
+                       velocity_min=30, velocity_max=127)
+    assert engine.speed_to_velocity(0.0) == 30
+    assert engine.speed_to_velocity(10.0) == 127
+    assert engine.speed_to_velocity(2.0) == round(30 + 0.5 * 97)
+
+
+def test_strike_from_rest_uses_crossing_speed():
+    engine = PadEngine([(0.5, 0.8)], [0.1])
+    # Quieta cuatro frames y después un golpe rápido (6 alturas/s en el cruce)
+    hits = run_frames(engine, [(0.5, 0.5)] * 4 + [(0.5, 0.6), (0.5, 0.8)])
+    assert len(hits) == 1
+    assert hits[0].speed == pytest.approx(6.0)
+    assert hits[0].velocity == engine.velocity_max
+
+
+# ----- Manos perdidas -----
+
+def test_short_dropout_does_not_retrigger():
+    engine = PadEngine([(0.5, 0.8)], [0.1], dropout_grace=0.15)
+    inside = (0.5, 0.8)
+    hits = run_frames(engine, [(0.5, 0.6), inside, None, None, inside, inside])
+    assert len(hits) == 1
+
+
+def test_dropout_longer_than_grace_counts_as_new_entry():
+    engine = PadEngine([(0.5, 0.8)], [0.1], dropout_grace=0.05)
+    inside = (0.5, 0.8)
+    hits = run_frames(engine, [(0.5, 0.6), inside, None, None, None, inside])
+    assert len(hits) == 2
+    assert hits[1].velocity == engine.default_velocity
+
+
+# ----- Agenda de notas -----
+
+def test_keyed_schedule_replaces_pending_note_off():
+    output = RecordingOutput()
+    scheduler = NoteScheduler(output)
+    base = time.monotonic() + 60  # Lejos en el futuro: nada sale antes de close()
+    note_on = mido.Message('note_on', note=36, velocity=100)
+    note_off = mido.Message('note_off', note=36, velocity=0)
+
+    scheduler.schedule(base, note_on)
+    scheduler.schedule(base + 0.15, note_off, key=('pad_off', 36))
+    scheduler.schedule(base + 0.125, note_on)
+    scheduler.schedule(base + 0.275, note_off, key=('pad_off', 36))
+    scheduler.close(flush=True)
+
+    assert [msg.type for msg in output.sent] == ['note_on', 'note_on', 'note_off']
+
+
+def test_schedule_in_the_past_is_sent_and_counted_late():
+    output = RecordingOutput()
+    scheduler = NoteScheduler(output)
+    assert scheduler.schedule(time.monotonic() - 1.0, mido.Message('note_on', note=36))
+    assert not scheduler.schedule(time.monotonic() + 60, mido.Message('note_on', note=38))
+    deadline = time.monotonic() + 2.0
+    while not output.sent and time.monotonic() < deadline:
+        time.sleep(0.001)
+    scheduler.close(flush=False)
+
+    assert scheduler.late == 1
+    assert [msg.note for msg in output.sent] == [36]